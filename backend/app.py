@@ -8,10 +8,11 @@ from flask_limiter.util import get_remote_address
 
 from config import (
     HOST, PORT, DEBUG, ORIGIN_URL,
-    RATE_LIMIT_DEFAULT, RATE_LIMIT_BATCH, RATE_LIMIT_DIRECT
+    RATE_LIMIT_DEFAULT, RATE_LIMIT_BATCH, RATE_LIMIT_DIRECT,
+    OCR_EXECUTION_MODE
 )
 from routes import register_blueprints
-from ml.ocr import load_ocr_model
+from ml.ocr import load_ocr_model, start_ocr_process_pool, shutdown_ocr_process_pool
 from models import init_pg_pool, get_db_connection
 from core.worker import start_worker
 from core.scheduler import start_scheduler, shutdown_scheduler
@@ -118,7 +119,11 @@ def print_startup_info():
     print(f"\nProtected OCR Endpoints (requires JWT):")
     print(f"  POST /ocr            - Single image OCR with queue")
     print(f"  POST /ocr/batch      - Batch image OCR with queue")
-    print(f"  GET  /take/<job_id>  - Get job results")
+    print(f"  GET  /take/<job_id>  - Get job results (?wait=30 to long-poll)")
+    print(f"  GET  /take/<job_id>/events - Stream job status (SSE)")
+    print(f"  POST /take/bulk      - Get the status of many jobs")
+    print(f"  GET  /jobs           - List your jobs")
+    print(f"  DELETE /take/<job_id> - Cancel a queued or running job")
     print(f"  POST /ocr/direct     - Direct OCR (no queue)")
     print(f"\nPublic Endpoints:")
     print(f"  GET  /stats          - Server statistics")
@@ -134,8 +139,11 @@ def main():
         # Initialize database
         init_db()
         
-        # Load OCR model
-        load_ocr_model()
+        # Load OCR model (once per worker process in "process" mode)
+        if OCR_EXECUTION_MODE == "process":
+            start_ocr_process_pool()
+        else:
+            load_ocr_model()
         
         print("PaddleOCR ready (test skipped)")
         
@@ -151,13 +159,14 @@ def main():
             port=PORT,
             threaded=True,
             debug=False,  # Force disable debug mode
-            use_reloader=False  # Disable reloader to keep jobs in memory
+            use_reloader=False  # Disable reloader so the worker pool is not started twice
         )
         
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
         shutdown_scheduler()
+        shutdown_ocr_process_pool()
 
 
 if __name__ == "__main__":
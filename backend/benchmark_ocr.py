@@ -0,0 +1,258 @@
+"""
+OCR Model Benchmark - Run this script to compare an OCR model setup (inference
+backend and precision) against its baseline on sample images: latency, memory
+footprint and text parity / accuracy
+
+A different backend is compared against the stock paddle runtime; INT8 models
+are compared against the FP32 models on the same backend; --preprocess steps
+are compared against no preprocessing on the configured setup. If a sample has a
+ground-truth transcript next to it (receipt1.jpg -> receipt1.txt), accuracy
+against it is reported for both setups as well.
+
+Pages go through the same code as queued jobs: decode, preprocessing and
+tiling via run_ocr for single-page jobs, or with --batch all samples at once
+through the micro-batcher like the pages of a batch job (run_ocr_batched).
+
+Usage:
+    python benchmark_ocr.py samples/ --backend onnxruntime
+    python benchmark_ocr.py samples/ --precision int8 --min-similarity 0.95
+    python benchmark_ocr.py samples/ --precision int8 --batch
+    python benchmark_ocr.py samples/ --preprocess grayscale,contrast,crop
+"""
+import os
+import sys
+import time
+import argparse
+import difflib
+import resource
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from config import OCR_BACKEND, OCR_PRECISION, OCR_PAGE_WORKERS, OCR_BATCH_MAX_SIZE
+from utils.helpers import decode_image
+from ml import ocr
+from ml.ocr import (
+    OCR_BACKENDS, OCR_PRECISIONS, create_ocr_model, run_ocr, run_ocr_batched, check_preprocess_steps
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def collect_images(paths):
+    """Expand the given files and directories into a sorted list of image files"""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append(os.path.join(path, name))
+        else:
+            images.append(path)
+    return images
+
+
+def load_ground_truth(path):
+    """Transcript stored next to an image as <name>.txt, or None"""
+    truth_path = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(truth_path):
+        return None
+    with open(truth_path, "r", encoding="utf-8") as f:
+        return " ".join(f.read().split())
+
+
+def ocr_file(path, batched=False):
+    """Decode and OCR one sample the way the worker OCRs a queued page"""
+    with open(path, "rb") as f:
+        image = decode_image(f.read(), tiled=True)
+    if batched:
+        return run_ocr_batched(image)
+    return run_ocr(image)
+
+
+def max_rss_mb():
+    """Peak resident memory of this process so far, in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed_ocr(path, batched):
+    """OCR one sample and return (text, seconds)"""
+    start = time.perf_counter()
+    text = ocr_file(path, batched)
+    return text, time.perf_counter() - start
+
+
+def run_setup(backend, precision, files, batched):
+    """
+    OCR every sample with one model setup. Runs in its own process so its
+    memory footprint is measured in isolation.
+    
+    Returns:
+        Dict with texts, seconds per image, total seconds, model memory and
+        peak memory (MB)
+    """
+    baseline = max_rss_mb()
+    # Installed directly rather than through load_ocr_model, which would
+    # silently fall back to another setup
+    ocr.paddle_ocr = create_ocr_model(backend, precision)
+    ocr.ocr_setup = (backend, precision)
+    loaded = max_rss_mb()
+    
+    # Warm-up so one-time graph optimization is not counted as latency
+    ocr_file(files[0])
+    
+    start = time.perf_counter()
+    if batched:
+        # Pages in flight together share micro-batches, as in run_pages
+        with ThreadPoolExecutor(max_workers=max(OCR_PAGE_WORKERS, OCR_BATCH_MAX_SIZE)) as pool:
+            results = list(pool.map(lambda path: timed_ocr(path, True), files))
+    else:
+        results = [timed_ocr(path, False) for path in files]
+    total = time.perf_counter() - start
+    
+    return {
+        "texts": [text for text, _ in results],
+        "times": [seconds for _, seconds in results],
+        "total": total,
+        "model_mb": loaded - baseline,
+        "peak_mb": max_rss_mb() - baseline
+    }
+
+
+def setup_name(backend, precision, preprocess=None):
+    """Display name of a setup, e.g. paddle/fp32+grayscale,crop"""
+    name = f"{backend}/{precision}"
+    if preprocess is not None:
+        name += f"+{preprocess}" if preprocess else "+no-preprocess"
+    return name
+
+
+def run_isolated(backend, precision, files, batched, preprocess=None):
+    """
+    Run run_setup in a fresh process, or return None if the setup fails to load.
+    A preprocess string overrides OCR_PREPROCESS in that process.
+    """
+    name = setup_name(backend, precision, preprocess)
+    print(f"Running {name}...")
+    
+    # Spawned processes import config afresh, so they pick the override up
+    previous = os.environ.get("OCR_PREPROCESS")
+    if preprocess is not None:
+        os.environ["OCR_PREPROCESS"] = preprocess
+    
+    context = multiprocessing.get_context("spawn")
+    try:
+        with context.Pool(1) as pool:
+            return pool.apply(run_setup, (backend, precision, files, batched))
+    except Exception as e:
+        print(f"Failed to run {name}: {str(e)}")
+        return None
+    finally:
+        if previous is None:
+            os.environ.pop("OCR_PREPROCESS", None)
+        else:
+            os.environ["OCR_PREPROCESS"] = previous
+
+
+def similarity(reference, candidate):
+    """Character-level similarity of two OCR outputs (1.0 = identical)"""
+    if not reference and not candidate:
+        return 1.0
+    return difflib.SequenceMatcher(None, reference, candidate).ratio()
+
+
+def mean(values):
+    """Arithmetic mean"""
+    return sum(values) / len(values)
+
+
+def compare_setups(paths, backend, precision, min_similarity, batched=False, preprocess=None):
+    """
+    Benchmark (backend, precision) against its baseline, or with preprocess
+    set, those preprocessing steps against none on (backend, precision)
+    
+    Returns:
+        True if every image's text is within min_similarity of the baseline
+    """
+    if preprocess is not None:
+        reference = (backend, precision, "")
+        candidate = (backend, precision, preprocess)
+    else:
+        reference = ("paddle", "fp32", None) if precision == "fp32" else (backend, "fp32", None)
+        candidate = (backend, precision, None)
+    if reference == candidate:
+        print("Nothing to compare: choose a backend other than paddle, --precision int8 or --preprocess")
+        return False
+    
+    files = collect_images(paths)
+    if not files:
+        print("No images found")
+        return False
+    
+    truths = [load_ground_truth(path) for path in files]
+    
+    base = run_isolated(*reference[:2], files, batched, reference[2])
+    cand = run_isolated(*candidate[:2], files, batched, candidate[2])
+    if base is None or cand is None:
+        return False
+    
+    base_name = setup_name(*reference)
+    cand_name = setup_name(*candidate)
+    base_width = max(16, len(base_name) + 4)
+    cand_width = max(20, len(cand_name) + 4)
+    
+    print(f"\n{'image':36} {base_name + ' ms':>{base_width}} {cand_name + ' ms':>{cand_width}} {'similarity':>11}")
+    scores = []
+    for index, path in enumerate(files):
+        score = similarity(base["texts"][index], cand["texts"][index])
+        scores.append(score)
+        print(
+            f"{os.path.basename(path)[:36]:36} {base['times'][index] * 1000:{base_width}.1f} "
+            f"{cand['times'][index] * 1000:{cand_width}.1f} {score:11.3f}"
+        )
+    
+    base_latency = mean(base["times"])
+    cand_latency = mean(cand["times"])
+    print(f"\nMean latency: {base_name} {base_latency * 1000:.1f} ms, {cand_name} {cand_latency * 1000:.1f} ms "
+          f"({base_latency / cand_latency:.2f}x)")
+    print(f"Throughput: {base_name} {len(files) / base['total']:.2f} pages/s, "
+          f"{cand_name} {len(files) / cand['total']:.2f} pages/s")
+    print(f"Model memory: {base_name} {base['model_mb']:.0f} MB, {cand_name} {cand['model_mb']:.0f} MB")
+    print(f"Peak memory: {base_name} {base['peak_mb']:.0f} MB, {cand_name} {cand['peak_mb']:.0f} MB")
+    print(f"Similarity to {base_name}: mean {mean(scores):.3f}, min {min(scores):.3f} (required {min_similarity})")
+    
+    labelled = [index for index, truth in enumerate(truths) if truth is not None]
+    if labelled:
+        base_accuracy = mean([similarity(truths[i], base["texts"][i]) for i in labelled])
+        cand_accuracy = mean([similarity(truths[i], cand["texts"][i]) for i in labelled])
+        print(f"Accuracy vs ground truth ({len(labelled)} images): {base_name} {base_accuracy:.3f}, "
+              f"{cand_name} {cand_accuracy:.3f} (delta {cand_accuracy - base_accuracy:+.3f})")
+    
+    passed = min(scores) >= min_similarity
+    print("Parity check passed" if passed else "Parity check FAILED")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark an OCR model setup against its baseline")
+    parser.add_argument("paths", nargs="+", help="Image files or directories of sample images")
+    parser.add_argument("--backend", default=OCR_BACKEND, choices=OCR_BACKENDS)
+    parser.add_argument("--precision", default=OCR_PRECISION, choices=OCR_PRECISIONS)
+    parser.add_argument("--min-similarity", type=float, default=0.98,
+                        help="Lowest per-image text similarity to the baseline that still counts as parity")
+    parser.add_argument("--batch", action="store_true",
+                        help="OCR all samples together through the micro-batcher, like the pages of a batch job")
+    parser.add_argument("--preprocess", metavar="STEPS",
+                        help="Compare these OCR_PREPROCESS steps (e.g. grayscale,contrast,crop) against none")
+    args = parser.parse_args()
+    
+    if args.preprocess is not None:
+        steps = [step.strip() for step in args.preprocess.lower().split(",") if step.strip()]
+        try:
+            check_preprocess_steps(steps)
+        except ValueError as e:
+            parser.error(str(e))
+        args.preprocess = ",".join(steps)
+    
+    sys.exit(0 if compare_setups(
+        args.paths, args.backend, args.precision, args.min_similarity, args.batch, args.preprocess
+    ) else 1)
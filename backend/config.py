@@ -9,8 +9,45 @@ load_dotenv()
 
 # Queue Configuration
 MAX_QUEUE_SIZE = 100
+# Admission budgets for queued (not yet started) work, globally and per user
+MAX_QUEUED_PAGES = int(os.getenv("MAX_QUEUED_PAGES", 1000))
+MAX_QUEUED_BYTES = int(os.getenv("MAX_QUEUED_BYTES", 512 * 1024 * 1024))  # 512MB of compressed uploads
+MAX_USER_QUEUED_PAGES = int(os.getenv("MAX_USER_QUEUED_PAGES", 300))
+MAX_USER_QUEUED_BYTES = int(os.getenv("MAX_USER_QUEUED_BYTES", 128 * 1024 * 1024))  # 128MB
+MAX_USER_ACTIVE_JOBS = int(os.getenv("MAX_USER_ACTIVE_JOBS", 0))  # unfinished jobs per user, 0 = unlimited
 JOB_EXPIRY = 43200  # 12 hours
-AVG_TIME = 10  # 2 seconds per job
+
+# Push-based job status for /take
+TAKE_MAX_WAIT = 30  # longest ?wait= a long-poll request may hold, in seconds
+TAKE_STREAM_KEEPALIVE = 15  # SSE comment interval so proxies keep the stream open
+TAKE_STREAM_TIMEOUT = 600  # SSE streams end after this; clients reconnect
+TAKE_BULK_MAX_JOBS = 100  # job IDs accepted by one POST /take/bulk
+EXPIRY_SWEEP_INTERVAL = 60  # seconds between incremental expiry passes
+EXPIRY_BATCH_SIZE = 200  # max jobs evicted per pass, bounds time spent holding the queue lock
+ORPHAN_FILE_AGE = 3600  # unreferenced download files older than this are removed
+ORPHAN_SWEEP_INTERVAL = 3600  # seconds between download directory sweeps
+AVG_TIME = 10  # initial seconds-per-page estimate until real durations are observed
+ETA_SMOOTHING = float(os.getenv("ETA_SMOOTHING", 0.2))  # EWMA weight of the newest sample
+
+# OCR execution mode: "thread" runs inference in-process, "process" dispatches it
+# to a pool of worker processes that each preload their own PaddleOCR model
+OCR_EXECUTION_MODE = os.getenv("OCR_EXECUTION_MODE", "thread").lower()
+OCR_PROCESS_WORKERS = max(1, int(os.getenv("OCR_PROCESS_WORKERS", os.cpu_count() or 1)))
+
+# Worker Configuration. In "thread" mode every PaddleOCR call is serialized on one
+# model, so jobs and pages only run in parallel by default in "process" mode.
+# Raise OCR_WORKERS in thread mode for Kolosal-heavy traffic, which is network-bound.
+OCR_PARALLELISM = OCR_PROCESS_WORKERS if OCR_EXECUTION_MODE == "process" else 1
+OCR_WORKERS = max(1, int(os.getenv("OCR_WORKERS", OCR_PARALLELISM)))  # concurrent jobs
+OCR_PAGE_WORKERS = max(1, int(os.getenv("OCR_PAGE_WORKERS", OCR_PARALLELISM)))  # pages of batch jobs run in parallel
+FORMAT_WORKERS = max(1, int(os.getenv("FORMAT_WORKERS", 4)))  # AI formatting stage threads (network-bound)
+CONVERT_WORKERS = max(1, int(os.getenv("CONVERT_WORKERS", 2)))  # Excel/PDF conversion stage threads
+STAGE_QUEUE_SIZE = max(1, int(os.getenv("STAGE_QUEUE_SIZE", 8)))  # jobs buffered between pipeline stages
+
+# Scheduling: "fair" round-robins between users, "fifo" serves jobs in arrival order
+SCHEDULER_POLICY = os.getenv("SCHEDULER_POLICY", "fair").lower()
+FAIR_SHARE_QUANTUM = max(1, int(os.getenv("FAIR_SHARE_QUANTUM", 10)))  # pages credited per user turn
+FAIR_SHARE_BY_SIZE = os.getenv("FAIR_SHARE_BY_SIZE", "true").lower() == "true"  # charge jobs by page count
 
 # File Configuration
 MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
@@ -34,6 +71,51 @@ TEXT_DET_THRESH = 0.3
 TEXT_DET_BOX_THRESH = 0.5
 TEXT_RECOGNITION_BATCH_SIZE = 6
 
+# Inference runtime for the PP-OCR models: "paddle" (stock), "onnxruntime" or "openvino".
+# The latter two need PaddleOCR's high-performance inference dependencies installed
+# (paddleocr install_hpi_deps cpu); loading falls back to "paddle" if they fail.
+OCR_BACKEND = os.getenv("OCR_BACKEND", "paddle").lower()
+OCR_CPU_THREADS = max(0, int(os.getenv("OCR_CPU_THREADS", 0)))  # inference threads per model instance, 0 = runtime default
+
+# Model precision: "fp32" uses the stock PP-OCR models, "int8" loads quantized detection and
+# recognition models (e.g. PaddleSlim-quantized inference models) from the directories below.
+# The model names must match the models in those directories.
+OCR_PRECISION = os.getenv("OCR_PRECISION", "fp32").lower()
+OCR_INT8_DET_MODEL_DIR = os.getenv("OCR_INT8_DET_MODEL_DIR", "models/det_int8")
+OCR_INT8_REC_MODEL_DIR = os.getenv("OCR_INT8_REC_MODEL_DIR", "models/rec_int8")
+OCR_INT8_DET_MODEL_NAME = os.getenv("OCR_INT8_DET_MODEL_NAME", "PP-OCRv5_mobile_det")
+OCR_INT8_REC_MODEL_NAME = os.getenv("OCR_INT8_REC_MODEL_NAME", "PP-OCRv5_mobile_rec")
+
+# Pages of batch jobs are grouped into one PaddleOCR call of up to OCR_BATCH_MAX_SIZE
+# images, waiting at most OCR_BATCH_MAX_LATENCY seconds for a batch to fill (1 disables)
+OCR_BATCH_MAX_SIZE = max(1, int(os.getenv("OCR_BATCH_MAX_SIZE", 8)))
+OCR_BATCH_MAX_LATENCY = float(os.getenv("OCR_BATCH_MAX_LATENCY", 0.05))
+
+# Image preprocessing before PaddleOCR: comma-separated steps out of grayscale,
+# contrast, crop and binarize (contrast/crop/binarize imply grayscale). Empty (the
+# default) disables it; check accuracy with benchmark_ocr.py --preprocess first.
+OCR_PREPROCESS = tuple(
+    step.strip() for step in os.getenv("OCR_PREPROCESS", "").lower().split(",")
+    if step.strip()
+)
+OCR_CROP_TOLERANCE = 40  # intensity difference from the background that counts as content
+OCR_CROP_MARGIN = 16  # pixels of background kept around the content
+
+# Tiled OCR for tall images (long receipts): instead of shrinking the whole image to
+# MAX_IMAGE_DIMENSION, only its width is capped and it is OCR'd in overlapping bands
+OCR_TILING = os.getenv("OCR_TILING", "true").lower() == "true"
+OCR_TILE_ASPECT = 2.0  # height/width ratio from which an image counts as tall
+OCR_TILE_SIZE = int(os.getenv("OCR_TILE_SIZE", 1280))  # band height in pixels
+OCR_TILE_OVERLAP = 128  # pixels shared by neighbouring bands, more than a text line
+OCR_TILE_MAX_LENGTH = 8192  # tall images are still capped at this height
+
+# OCR result cache keyed by image content, engine and options. Entries are kept in
+# memory (LRU) and on disk in OCR_CACHE_DIR; each tier is capped in bytes, 0 disables the disk tier
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_MEMORY_BYTES = int(os.getenv("OCR_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))  # 32MB
+OCR_CACHE_DISK_BYTES = int(os.getenv("OCR_CACHE_DISK_BYTES", 512 * 1024 * 1024))  # 512MB
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "cache")
+
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 JWT_ACCESS_TOKEN_EXPIRES = 60 * 5  # 5 minutes
 JWT_REFRESH_TOKEN_EXPIRES = 60 * 60 * 24 * 30  # 1 month
@@ -65,7 +147,22 @@ KOLOSAL_MAX_TOKENS = int(os.getenv("KOLOSAL_MAX_TOKENS", 1000))
 # Kolosal OCR API configuration
 KOLOSAL_OCR_API_KEY = os.getenv("KOLOSAL_OCR_API_KEY", "")
 KOLOSAL_OCR_API_URL = "https://api.kolosal.ai/ocr"
+KOLOSAL_OCR_MAX_INFLIGHT = max(1, int(os.getenv("KOLOSAL_OCR_MAX_INFLIGHT", 8)))  # concurrent Kolosal OCR requests
 
 DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "download")
 
+# Webhook delivery
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # signs payloads with HMAC-SHA256 when set
+WEBHOOK_TIMEOUT = 5  # seconds per attempt
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", 4))
+WEBHOOK_MAX_RETRIES = int(os.getenv("WEBHOOK_MAX_RETRIES", 5))
+WEBHOOK_BACKOFF_BASE = 1.0  # seconds, doubled on every retry
+WEBHOOK_BACKOFF_MAX = 300  # seconds
+WEBHOOK_MAX_PENDING = 1000  # deliveries beyond this are dropped
+
+# Job persistence: "database" keeps queued jobs in the ocr_jobs table (with input
+# images spooled to JOB_SPOOL_DIR) so they survive restarts, "memory" does not
+JOB_STORE = os.getenv("JOB_STORE", "database").lower()
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "spool")
+
 ORIGIN_URL = os.getenv("ORIGIN_URL", "http://localhost:3000,http://localhost:5173").split(",")
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+ETA Estimator - Learns job durations from completed work (EWMA)
+"""
+import math
+import threading
+
+from config import AVG_TIME, ETA_SMOOTHING, OCR_WORKERS
+
+_lock = threading.Lock()
+
+# Effective seconds per page of OCR, keyed by engine. Measured as the OCR stage
+# wall time divided by page count, so page-level parallelism is accounted for.
+page_times = {}
+
+# Seconds spent in post-OCR stages, keyed by (engine, stage)
+stage_times = {}
+
+# Seconds from a worker picking a job up to its completion, all engines
+job_time = None
+
+samples = 0
+
+# Post-OCR stages in the order a job goes through them
+STAGES = ("formatting", "converting")
+
+
+def _ewma(previous, value):
+    """Exponentially weighted moving average update"""
+    if previous is None:
+        return value
+    return previous + ETA_SMOOTHING * (value - previous)
+
+
+def record_job(engine, pages, ocr_seconds, stage_seconds, total_seconds):
+    """
+    Record the durations of a completed job
+    
+    Args:
+        engine: OCR engine used by the job
+        pages: Number of pages processed
+        ocr_seconds: Wall time of the OCR stage
+        stage_seconds: dict of post-OCR stage name -> seconds
+        total_seconds: Wall time of the whole job
+    """
+    global job_time, samples
+    
+    with _lock:
+        page_times[engine] = _ewma(page_times.get(engine), ocr_seconds / max(1, pages))
+        for stage, seconds in stage_seconds.items():
+            stage_times[(engine, stage)] = _ewma(stage_times.get((engine, stage)), seconds)
+        job_time = _ewma(job_time, total_seconds)
+        samples += 1
+
+
+def get_page_time(engine):
+    """Expected seconds per page for an engine"""
+    return page_times.get(engine, AVG_TIME)
+
+
+def get_stage_time(engine, stage):
+    """Expected seconds for a post-OCR stage (0 until observed)"""
+    return stage_times.get((engine, stage), 0.0)
+
+
+def estimate_wait(position):
+    """Expected seconds a job waits in the queue behind `position` other jobs"""
+    average = job_time if job_time is not None else AVG_TIME
+    return position * average / OCR_WORKERS
+
+
+def estimate_drain_time(pages):
+    """Expected seconds for the worker pool to work through `pages` queued pages"""
+    with _lock:
+        observed = list(page_times.values())
+    average = sum(observed) / len(observed) if observed else AVG_TIME
+    return pages * average / OCR_WORKERS
+
+
+def estimate_remaining(job):
+    """Expected seconds until a job finishes, based on its current status"""
+    engine = job.get("engine", "paddleocr")
+    status = job.get("status", "queued")
+    
+    if status in ("queued", "processing"):
+        pages_left = job.get("total_images", 1) - job.get("processed", 0)
+        return max(0, pages_left) * get_page_time(engine) + sum(
+            get_stage_time(engine, stage) for stage in STAGES
+        )
+    
+    if status in STAGES:
+        remaining_stages = STAGES[STAGES.index(status):]
+        return sum(get_stage_time(engine, stage) for stage in remaining_stages)
+    
+    return 0.0
+
+
+def estimate_eta(job, position):
+    """ETA in whole seconds for a job at the given queue position"""
+    return int(math.ceil(estimate_wait(position) + estimate_remaining(job)))
+
+
+def get_eta_stats():
+    """Get the current duration estimates"""
+    with _lock:
+        return {
+            "samples": samples,
+            "avg_job_time": round(job_time if job_time is not None else AVG_TIME, 3),
+            "page_time": {engine: round(t, 3) for engine, t in page_times.items()},
+            "stage_time": {
+                f"{engine}:{stage}": round(t, 3)
+                for (engine, stage), t in stage_times.items()
+            }
+        }
@@ -0,0 +1,135 @@
+"""
+Job Store - Pluggable persistence backends for OCR queue jobs
+"""
+import os
+import json
+import shutil
+import logging
+import threading
+
+from config import JOB_STORE, JOB_SPOOL_DIR
+from models import ensure_ocr_jobs_table, save_ocr_job, get_ocr_jobs, delete_ocr_job
+
+logger = logging.getLogger(__name__)
+
+# Job fields that only live in memory and are never written to the store
+TRANSIENT_FIELDS = ("images",)
+
+
+class MemoryJobStore:
+    """No persistence - jobs only live in the process and are lost on restart"""
+    name = "memory"
+    
+    def init(self):
+        pass
+    
+    def save_job(self, job):
+        pass
+    
+    def delete_job(self, job_id):
+        pass
+    
+    def load_jobs(self):
+        return []
+    
+    def spool_images(self, job_id, images):
+        """Keep the compressed page bytes in memory as the job's page sources"""
+        return images
+    
+    def load_spooled_images(self, job_id):
+        return None
+    
+    def delete_spool(self, job_id):
+        pass
+
+
+class DatabaseJobStore(MemoryJobStore):
+    """
+    Persists job metadata in the ocr_jobs table (SQLite or PostgreSQL, via
+    models.get_db_connection) and input images as files under JOB_SPOOL_DIR
+    """
+    name = "database"
+    
+    def __init__(self):
+        # Serializes snapshot + write so saves from different threads commit in
+        # the order they were taken and the latest in-memory state always wins
+        self._lock = threading.Lock()
+    
+    def init(self):
+        ensure_ocr_jobs_table()
+        os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    
+    def save_job(self, job):
+        with self._lock:
+            try:
+                # dict.copy() is a single atomic step, unlike iterating a job
+                # that other threads may be adding keys to
+                data = job.copy()
+                for field in TRANSIENT_FIELDS:
+                    data.pop(field, None)
+                save_ocr_job(
+                    data["id"], data.get("user_id"), data["status"],
+                    json.dumps(data, default=str), data["created_at"]
+                )
+            except Exception:
+                logger.exception("Failed to persist job %s (status %s)", job["id"], job.get("status"))
+    
+    def delete_job(self, job_id):
+        with self._lock:
+            try:
+                delete_ocr_job(job_id)
+            except Exception:
+                logger.exception("Failed to delete persisted job %s", job_id)
+        self.delete_spool(job_id)
+    
+    def load_jobs(self):
+        return [json.loads(row["data"]) for row in get_ocr_jobs()]
+    
+    def _spool_path(self, job_id):
+        return os.path.join(JOB_SPOOL_DIR, job_id)
+    
+    def spool_images(self, job_id, images):
+        """Write the original upload bytes to disk and return the spool file paths"""
+        job_dir = self._spool_path(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        paths = []
+        for idx, data in enumerate(images):
+            path = os.path.join(job_dir, f"{idx:04d}.img")
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+        return paths
+    
+    def load_spooled_images(self, job_id):
+        """Spool file paths of a persisted job, in page order"""
+        job_dir = self._spool_path(job_id)
+        if not os.path.isdir(job_dir):
+            return None
+        return [os.path.join(job_dir, name) for name in sorted(os.listdir(job_dir))]
+    
+    def delete_spool(self, job_id):
+        shutil.rmtree(self._spool_path(job_id), ignore_errors=True)
+
+
+def read_page_bytes(source):
+    """Compressed bytes of a job page - held in memory or read from its spool file"""
+    if isinstance(source, (bytes, bytearray)):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
+
+
+JOB_STORES = {
+    "memory": MemoryJobStore,
+    "database": DatabaseJobStore,
+}
+
+
+def create_job_store(name=JOB_STORE):
+    """Create the job store backend selected by JOB_STORE"""
+    if name not in JOB_STORES:
+        raise ValueError(f"Unknown JOB_STORE '{name}', expected one of: {', '.join(JOB_STORES)}")
+    return JOB_STORES[name]()
+
+
+job_store = create_job_store()
@@ -0,0 +1,269 @@
+"""
+OCR Result Cache - Content-addressed, with an in-memory LRU and a disk tier
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from config import (
+    OCR_CACHE_ENABLED, OCR_CACHE_MEMORY_BYTES, OCR_CACHE_DIR, OCR_CACHE_DISK_BYTES,
+    MAX_IMAGE_DIMENSION, OCR_PREPROCESS, OCR_CROP_TOLERANCE, OCR_CROP_MARGIN,
+    OCR_TILING, OCR_TILE_ASPECT, OCR_TILE_SIZE, OCR_TILE_OVERLAP, OCR_TILE_MAX_LENGTH
+)
+from utils.helpers import decode_image
+from ml.ocr import get_ocr_setup
+
+_lock = threading.Lock()
+
+# key -> (result, size in bytes), least recently used first
+memory_entries = OrderedDict()
+memory_bytes = 0
+
+# key -> file size for entries on disk, least recently used first. Built from
+# the cache directory on first use so the disk tier survives restarts.
+disk_entries = None
+disk_bytes = 0
+
+cache_stats = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "evictions": 0
+}
+
+
+def pipeline_fingerprint(engine: str) -> dict:
+    """
+    Server settings that change an engine's output for the same image and
+    options. Part of the cache key, so disk entries written under another
+    model, backend or preprocessing setup are never returned after a restart.
+    """
+    fingerprint = {"max_dimension": MAX_IMAGE_DIMENSION}
+    if engine.startswith("kolosal"):
+        return fingerprint
+    
+    fingerprint.update(
+        model=get_ocr_setup(),
+        preprocess=OCR_PREPROCESS,
+        crop=(OCR_CROP_TOLERANCE, OCR_CROP_MARGIN),
+        tiling=(OCR_TILE_ASPECT, OCR_TILE_SIZE, OCR_TILE_OVERLAP, OCR_TILE_MAX_LENGTH) if OCR_TILING else None
+    )
+    return fingerprint
+
+
+def cache_key(data: bytes, engine: str, options: dict = None) -> str:
+    """
+    Build the cache key of an OCR request
+    
+    Args:
+        data: Compressed image bytes as uploaded
+        engine: OCR engine variant (e.g. paddleocr, paddleocr-enhanced, kolosalocr)
+        options: Engine options that affect the result
+    
+    Returns:
+        Hex digest identifying the image, engine, options and pipeline settings
+    """
+    digest = hashlib.sha256(data)
+    digest.update(b"\0" + engine.encode())
+    digest.update(b"\0" + json.dumps(options or {}, sort_keys=True, default=str).encode())
+    digest.update(b"\0" + json.dumps(pipeline_fingerprint(engine), sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _entry_path(key):
+    """Disk location of an entry, fanned out over subdirectories by key prefix"""
+    return os.path.join(OCR_CACHE_DIR, key[:2], f"{key}.json")
+
+
+def _load_disk_index_internal():
+    """Scan the cache directory, oldest access first (internal - lock held)"""
+    global disk_entries, disk_bytes
+    
+    entries = []
+    if os.path.isdir(OCR_CACHE_DIR):
+        for root, _, files in os.walk(OCR_CACHE_DIR):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name[:-5], stat.st_size))
+    
+    entries.sort()
+    disk_entries = OrderedDict((key, size) for _, key, size in entries)
+    disk_bytes = sum(disk_entries.values())
+
+
+def _remember_internal(key, result, size):
+    """Insert into the memory tier and evict down to its byte budget (internal - lock held)"""
+    global memory_bytes
+    
+    if size > OCR_CACHE_MEMORY_BYTES:
+        return
+    
+    if key in memory_entries:
+        memory_bytes -= memory_entries.pop(key)[1]
+    memory_entries[key] = (result, size)
+    memory_bytes += size
+    
+    while memory_bytes > OCR_CACHE_MEMORY_BYTES:
+        _, (_, evicted_size) = memory_entries.popitem(last=False)
+        memory_bytes -= evicted_size
+        cache_stats["evictions"] += 1
+
+
+def _evict_disk_internal():
+    """Delete least recently used files until the disk tier fits (internal - lock held)"""
+    global disk_bytes
+    
+    while disk_bytes > OCR_CACHE_DISK_BYTES and disk_entries:
+        key, size = disk_entries.popitem(last=False)
+        disk_bytes -= size
+        cache_stats["evictions"] += 1
+        try:
+            os.remove(_entry_path(key))
+        except OSError:
+            pass
+
+
+def get_cached(key):
+    """
+    Look up an OCR result, memory first, then disk
+    
+    Returns:
+        The cached result, or None on a miss
+    """
+    global disk_bytes
+    
+    if not OCR_CACHE_ENABLED:
+        return None
+    
+    with _lock:
+        entry = memory_entries.get(key)
+        if entry is not None:
+            memory_entries.move_to_end(key)
+            cache_stats["memory_hits"] += 1
+            return entry[0]
+        
+        if OCR_CACHE_DISK_BYTES <= 0:
+            cache_stats["misses"] += 1
+            return None
+        
+        if disk_entries is None:
+            _load_disk_index_internal()
+        
+        if key not in disk_entries:
+            cache_stats["misses"] += 1
+            return None
+    
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = f.read()
+        result = json.loads(raw)
+        os.utime(path)
+    except (OSError, ValueError):
+        # Unreadable or removed behind our back - forget the entry
+        with _lock:
+            size = disk_entries.pop(key, None)
+            if size is not None:
+                disk_bytes -= size
+            cache_stats["misses"] += 1
+        return None
+    
+    with _lock:
+        if key in disk_entries:
+            disk_entries.move_to_end(key)
+        cache_stats["disk_hits"] += 1
+        _remember_internal(key, result, len(raw))
+    
+    return result
+
+
+def put_cached(key, result):
+    """Store an OCR result in both tiers. Empty results are never cached."""
+    global disk_bytes
+    
+    if not OCR_CACHE_ENABLED or not result:
+        return
+    
+    raw = json.dumps(result, default=str)
+    size = len(raw)
+    
+    with _lock:
+        _remember_internal(key, result, size)
+        cache_stats["stores"] += 1
+        
+        if OCR_CACHE_DISK_BYTES <= 0 or size > OCR_CACHE_DISK_BYTES:
+            return
+        if disk_entries is None:
+            _load_disk_index_internal()
+        if key in disk_entries:
+            disk_entries.move_to_end(key)
+            return
+    
+    path = _entry_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"OCR cache write failed: {str(e)}")
+        return
+    
+    with _lock:
+        if key not in disk_entries:
+            disk_entries[key] = size
+            disk_bytes += size
+        _evict_disk_internal()
+
+
+def cached_ocr(data: bytes, engine: str, options: dict, ocr_image, tiled: bool = False):
+    """
+    OCR an image through the cache. The image is only decoded on a miss.
+    
+    Args:
+        data: Compressed image bytes
+        engine: OCR engine variant, part of the cache key
+        options: Engine options, part of the cache key
+        ocr_image: Function running OCR on the decoded PIL image
+        tiled: ocr_image OCRs tall images in tiles (PaddleOCR), so they are
+            decoded at their full height rather than capped like other images
+    
+    Returns:
+        The cached or freshly computed OCR result
+    """
+    key = cache_key(data, engine, options)
+    
+    result = get_cached(key)
+    if result is None:
+        result = ocr_image(decode_image(data, tiled=tiled))
+        put_cached(key, result)
+    return result
+
+
+def get_cache_stats():
+    """Get OCR cache metrics"""
+    with _lock:
+        stats = dict(cache_stats)
+        stats.update(
+            enabled=OCR_CACHE_ENABLED,
+            memory_entries=len(memory_entries),
+            memory_bytes=memory_bytes,
+            max_memory_bytes=OCR_CACHE_MEMORY_BYTES,
+            disk_entries=len(disk_entries) if disk_entries is not None else None,
+            disk_bytes=disk_bytes if disk_entries is not None else None,
+            max_disk_bytes=OCR_CACHE_DISK_BYTES
+        )
+    
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else None
+    return stats
@@ -1,38 +1,113 @@
 """
 Queue Management Service
 """
+import os
+import math
+import heapq
 import uuid
 import time
 import threading
+from collections import deque
 
-from config import MAX_QUEUE_SIZE, AVG_TIME, JOB_EXPIRY
+from config import (
+    MAX_QUEUE_SIZE, JOB_EXPIRY, EXPIRY_BATCH_SIZE, ORPHAN_FILE_AGE, OCR_WORKERS,
+    MAX_QUEUED_PAGES, MAX_QUEUED_BYTES, MAX_USER_QUEUED_PAGES, MAX_USER_QUEUED_BYTES,
+    SCHEDULER_POLICY, FAIR_SHARE_QUANTUM, FAIR_SHARE_BY_SIZE, MAX_USER_ACTIVE_JOBS
+)
+from core.job_store import job_store
+from core.eta import estimate_eta, estimate_wait, estimate_drain_time
+from services.file_converter_service import remove_download_file, sweep_orphaned_files
+from services.webhook_service import send_webhook
 
-# Queue state
-queue = []
+# Queue state - one FIFO deque per user, served in deficit round-robin order.
+# With the "fifo" policy every job shares a single bucket, which is plain FIFO.
+user_queues = {}
+user_ring = deque()  # users with queued jobs, the head is served next
+user_deficits = {}  # pages each user may still spend before yielding its turn
+user_live = {}  # queued jobs per user that are not cancelled tombstones
+queued_count = 0
 queue_lock = threading.Lock()
+queue_cond = threading.Condition(queue_lock)  # signalled when a job is queued or a slot frees up
 jobs = {}
-CURRENT_JOB = None
+ACTIVE_JOBS = set()
+worker_states = {}
+
+# Per-user sequence numbers for O(1) position lookup: a queued job's rank within
+# its user's queue is its sequence number minus the jobs dequeued for that user
+user_enqueued = {}
+user_dequeued = {}
+
+# Admission control accounting for queued work: [pages, input bytes]
+queued_pages = 0
+queued_bytes = 0
+user_usage = {}
+
+# Secondary index over jobs: user_id -> {job_id: None} in creation order, and
+# the number of each user's jobs that have not finished yet
+user_jobs = {}
+user_active_jobs = {}
+
+# Min-heap of (expires_at, job_id) so expiry only touches jobs that are due.
+# Entries of jobs deleted earlier are skipped when they reach the top.
+expiry_heap = []
+
+# Long-poll and SSE clients wait for job changes on a per-job condition that
+# only exists while the job has waiters: job_id -> [Condition, waiter count].
+# Every job carries a "version" that is bumped on each update, so a waiter only
+# wakes up for real transitions. Waiters watching a queued job's position wait
+# on queue_moved instead, which fires once per job leaving the queue since that
+# shifts every position. Never acquire job_events_lock while holding queue_lock.
+job_events_lock = threading.Lock()
+job_waiters = {}
+queue_moved = threading.Condition(job_events_lock)
+
+# Statuses after which a job no longer changes
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+# Job fields that change on every page. Updates touching only these are not
+# persisted: recovered jobs restart from the first page, so the store only
+# needs status transitions, not per-page progress.
+PROGRESS_FIELDS = frozenset(("processed",))
+
+# Longest Retry-After we ever suggest to a rejected client
+MAX_RETRY_AFTER = 3600
+
+
+class QueueFullError(Exception):
+    """Raised by create_job when admitting the job would exceed a queue budget"""
+    
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 def get_queue_state():
     """Get current queue state"""
     return {
-        "queue": queue,
+        "user_queues": user_queues,
+        "user_ring": user_ring,
         "queue_lock": queue_lock,
         "jobs": jobs,
-        "current_job": CURRENT_JOB
+        "active_jobs": ACTIVE_JOBS,
+        "workers": worker_states
     }
 
 
-def set_current_job(job_id):
-    """Set the current job being processed"""
-    global CURRENT_JOB
-    CURRENT_JOB = job_id
+def register_worker(worker_id):
+    """Register a worker in the pool as idle"""
+    with queue_lock:
+        worker_states[worker_id] = {
+            "state": "idle",
+            "job_id": None,
+            "since": time.time(),
+            "jobs_done": 0
+        }
 
 
-def get_current_job():
-    """Get the current job being processed"""
-    return CURRENT_JOB
+def get_active_jobs():
+    """Get IDs of the jobs currently being processed"""
+    with queue_lock:
+        return list(ACTIVE_JOBS)
 
 
 def create_job(job_type, images, webhook=None, use_enhanced=False, ocr_options=None, user_id=None, file_type="excel", engine="paddleocr"):
@@ -41,7 +116,7 @@ def create_job(job_type, images, webhook=None, use_enhanced=False, ocr_options=N
     
     Args:
         job_type: 'single' or 'batch'
-        images: List of PIL Images
+        images: List of compressed image bytes, decoded one page at a time by the worker
         webhook: Optional webhook URL for completion notification
         use_enhanced: Whether to use enhanced OCR mode
         ocr_options: Optional OCR configuration options
@@ -50,73 +125,604 @@ def create_job(job_type, images, webhook=None, use_enhanced=False, ocr_options=N
         engine: OCR engine to use ('paddleocr' or 'kolosalocr')
     
     Returns:
-        Tuple of (job_id, position, eta) or (None, None, None) if queue is full
+        Tuple of (job_id, position, eta)
+    
+    Raises:
+        QueueFullError: if the queue's job, page or byte budget is exhausted
     """
+    total_img = len(images)
+    input_bytes = sum(len(data) for data in images)
+    
+    # Cheap early reject so a full queue never pays for spooling the images
     with queue_lock:
-        if len(queue) >= MAX_QUEUE_SIZE:
-            return None, None, None
-        
-        job_id = str(uuid.uuid4())
-        total_img = len(images)
-        
-        job_data = {
-            "id": job_id,
-            "type": job_type,
-            "images": images,
-            "status": "queued",
-            "result": None,
-            "file_path": None,
-            "file_type": file_type,
-            "engine": engine,  # Add engine field
-            "chat_id": None,
-            "total_images": total_img,
-            "processed": 0,
-            "webhook": webhook,
-            "use_enhanced": use_enhanced,
-            "ocr_options": ocr_options or {},
-            "created_at": time.time(),
-            "user_id": user_id
-        }
-        
-        jobs[job_id] = job_data
-        queue.append(job_id)
-        position = len(queue) - 1
-        eta = (position * AVG_TIME) + (AVG_TIME * total_img)
+        _check_admission_internal(user_id, total_img, input_bytes)
+    
+    job_id = str(uuid.uuid4())
+    
+    job_data = {
+        "id": job_id,
+        "type": job_type,
+        "images": images,
+        "status": "queued",
+        "result": None,
+        "file_path": None,
+        "file_type": file_type,
+        "engine": engine,  # Add engine field
+        "chat_id": None,
+        "total_images": total_img,
+        "input_bytes": input_bytes,
+        "processed": 0,
+        "webhook": webhook,
+        "use_enhanced": use_enhanced,
+        "ocr_options": ocr_options or {},
+        "created_at": time.time(),
+        "user_id": user_id,
+        "queue_seq": None
+    }
+    
+    # Persist before enqueueing so a crash never leaves a queued job without its inputs.
+    # With a spooling store the job only keeps file paths in memory.
+    job_data["images"] = job_store.spool_images(job_id, images)
+    job_store.save_job(job_data)
+    
+    try:
+        with queue_lock:
+            _check_admission_internal(user_id, total_img, input_bytes)
+            _track_job_internal(job_data)
+            _enqueue_job_internal(job_data)
+            position = _estimate_position_internal(job_data)
+            eta = estimate_eta(job_data, position)
+            queue_cond.notify()
+    except QueueFullError:
+        job_store.delete_job(job_id)
+        raise
     
     return job_id, position, eta
 
 
+def _track_job_internal(job):
+    """Register a job, index it by user and schedule its expiry (internal - no lock)"""
+    jobs[job["id"]] = job
+    heapq.heappush(expiry_heap, (job["created_at"] + JOB_EXPIRY, job["id"]))
+    
+    user_id = job.get("user_id")
+    if user_id is not None:
+        user_jobs.setdefault(user_id, {})[job["id"]] = None
+        if job["status"] not in FINISHED_STATUSES:
+            _count_active_internal(user_id, 1)
+
+
+def _untrack_job_internal(job):
+    """Remove a job from the jobs dict and the user index (internal - no lock)"""
+    del jobs[job["id"]]
+    
+    user_id = job.get("user_id")
+    if user_id is not None:
+        owned = user_jobs.get(user_id)
+        if owned is not None:
+            owned.pop(job["id"], None)
+            if not owned:
+                del user_jobs[user_id]
+        if job["status"] not in FINISHED_STATUSES:
+            _count_active_internal(user_id, -1)
+
+
+def _count_active_internal(user_id, delta):
+    """Adjust a user's unfinished job count (internal - no lock)"""
+    count = user_active_jobs.get(user_id, 0) + delta
+    if count > 0:
+        user_active_jobs[user_id] = count
+    else:
+        user_active_jobs.pop(user_id, None)
+
+
+def get_user_active_jobs(user_id):
+    """Number of the user's jobs that have not finished (constant time)"""
+    return user_active_jobs.get(user_id, 0)
+
+
+def _check_admission_internal(user_id, pages, nbytes):
+    """
+    Raise QueueFullError if a job of `pages` pages and `nbytes` input bytes does
+    not fit the queue budgets (internal - no lock). Retry-After is the time the
+    pool needs to drain enough queued work for the job to fit.
+    
+    A job larger than a budget on its own (e.g. a full batch of 2MB images
+    against MAX_USER_QUEUED_BYTES) is admitted once nothing else is queued in
+    that scope, so it waits for a full drain instead of being rejected forever.
+    """
+    if queued_count >= MAX_QUEUE_SIZE:
+        raise QueueFullError("Queue is full", _retry_after(estimate_wait(1)))
+    
+    if MAX_USER_ACTIVE_JOBS and user_active_jobs.get(user_id, 0) >= MAX_USER_ACTIVE_JOBS:
+        raise QueueFullError("You have too many unfinished jobs", _retry_after(estimate_wait(1)))
+    
+    user_pages, user_bytes = user_usage.get(user_id, (0, 0))
+    
+    scopes = (
+        (queued_pages, queued_bytes, MAX_QUEUED_PAGES, MAX_QUEUED_BYTES,
+         "Too many pages queued", "Too much image data queued"),
+        (user_pages, user_bytes, MAX_USER_QUEUED_PAGES, MAX_USER_QUEUED_BYTES,
+         "You have too many pages queued", "You have too much image data queued"),
+    )
+    for scope_pages, scope_bytes, max_pages, max_bytes, pages_message, bytes_message in scopes:
+        if not scope_pages:
+            continue
+        
+        pages_over = scope_pages + pages - max_pages
+        bytes_over = scope_bytes + nbytes - max_bytes
+        if pages_over <= 0 and bytes_over <= 0:
+            continue
+        
+        if pages > max_pages or nbytes > max_bytes:
+            # Only fits once everything queued ahead of it has drained
+            drain = scope_pages
+        else:
+            # Pages to drain, converting the byte overage at the scope's average page size
+            drain = max(pages_over, math.ceil(bytes_over * scope_pages / scope_bytes) if scope_bytes else 0)
+            drain = min(drain, scope_pages)
+        
+        message = pages_message if pages_over > 0 else bytes_message
+        raise QueueFullError(message, _retry_after(estimate_drain_time(drain)))
+
+
+def _retry_after(seconds):
+    """Clamp a wait estimate into a Retry-After value in whole seconds"""
+    return int(min(MAX_RETRY_AFTER, max(1, math.ceil(seconds))))
+
+
 def get_job(job_id):
     """Get a job by ID"""
     return jobs.get(job_id)
 
 
 def update_job(job_id, **kwargs):
-    """Update job properties"""
-    if job_id in jobs:
-        jobs[job_id].update(kwargs)
+    """Update job properties, persisting everything but per-page progress"""
+    job = jobs.get(job_id)
+    if job is not None:
+        left_queue = job["status"] == "queued" and kwargs.get("status", "queued") != "queued"
+        if kwargs.get("status") in FINISHED_STATUSES:
+            with queue_lock:
+                if job["status"] not in FINISHED_STATUSES and job.get("user_id") is not None:
+                    _count_active_internal(job["user_id"], -1)
+                job.update(kwargs)
+        else:
+            job.update(kwargs)
+        _notify_job_changed(job, left_queue)
+        if not PROGRESS_FIELDS.issuperset(kwargs):
+            job_store.save_job(job)
 
 
 def delete_job(job_id):
     """Delete a job"""
-    if job_id in jobs:
-        del jobs[job_id]
+    with queue_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        _untrack_job_internal(job)
+    
+    job_store.delete_job(job_id)
+    _notify_jobs_deleted([job_id])
+
+
+def _notify_job_changed(job, left_queue=False):
+    """Bump a job's version and wake the clients waiting on it"""
+    with job_events_lock:
+        job["version"] = job.get("version", 0) + 1
+        waiters = job_waiters.get(job["id"])
+        if waiters is not None:
+            waiters[0].notify_all()
+        if left_queue or job["status"] == "queued":
+            queue_moved.notify_all()
+
+
+def _notify_jobs_deleted(job_ids):
+    """Wake the clients waiting on jobs that were just deleted"""
+    with job_events_lock:
+        for job_id in job_ids:
+            waiters = job_waiters.get(job_id)
+            if waiters is not None:
+                waiters[0].notify_all()
+
+
+def wait_for_job_change(job_id, version, position=None, timeout=30):
+    """
+    Block until a job changes, for long-polling
+    
+    Args:
+        job_id: Job ID
+        version: Job version the client already has
+        position: Queue position the client already has (queued jobs only)
+        timeout: Max seconds to wait
+    
+    Returns:
+        The job (possibly unchanged on timeout), or None if it no longer exists
+    """
+    deadline = time.time() + timeout
+    
+    with job_events_lock:
+        waiters = job_waiters.setdefault(job_id, [threading.Condition(job_events_lock), 0])
+        waiters[1] += 1
+        try:
+            while True:
+                job = jobs.get(job_id)
+                if job is None or job.get("version", 0) != version:
+                    return job
+                
+                # Positions move when other jobs leave the queue, which
+                # notifies queue_moved
+                watch_position = position is not None and job["status"] == "queued"
+                if watch_position and get_job_position(job_id) != position:
+                    return job
+                
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return job
+                (queue_moved if watch_position else waiters[0]).wait(remaining)
+        finally:
+            waiters[1] -= 1
+            if not waiters[1]:
+                del job_waiters[job_id]
+
+
+def release_job_images(job_id):
+    """Drop a finished job's input images from memory and from the spool"""
+    job = jobs.get(job_id)
+    if job is not None:
+        job["images"] = None
+    job_store.delete_spool(job_id)
+
+
+def finish_job(job_id):
+    """Release a finished (done, failed or cancelled) job's inputs and notify its webhook"""
+    job = get_job(job_id)
+    
+    # Clear images from memory and the spool
+    release_job_images(job_id)
+    
+    # Send webhook if configured - delivered in the background with retries
+    webhook = job.get("webhook") if job else None
+    if webhook:
+        payload = {
+            "job_id": job_id,
+            "status": job.get("status"),
+            "file_type": job.get("file_type"),
+            "engine": job.get("engine"),
+            "chat_id": job.get("chat_id")
+        }
+        if job.get("status") == "failed":
+            payload["error"] = job.get("error")
+        send_webhook(webhook, payload)
+
+
+def recover_jobs():
+    """
+    Reload persisted jobs at startup. Finished jobs are restored so their
+    results stay downloadable; queued and in-flight jobs are requeued in
+    their original order and restart from the first page.
+    """
+    job_store.init()
+    
+    current_time = time.time()
+    restored = 0
+    requeued = 0
+    
+    for job in job_store.load_jobs():
+        job_id = job["id"]
+        
+        if (current_time - job.get("created_at", current_time)) > JOB_EXPIRY:
+            job_store.delete_job(job_id)
+            continue
+        
+        if job["status"] in FINISHED_STATUSES:
+            job["images"] = None
+            job_store.delete_spool(job_id)
+            with queue_lock:
+                _track_job_internal(job)
+            restored += 1
+            continue
+        
+        if job.pop("cancel_requested", False):
+            # Cancelled while running when the server stopped - finish the cancellation
+            job.update(images=None, status="cancelled", completed_at=current_time)
+            job_store.delete_spool(job_id)
+            with queue_lock:
+                _track_job_internal(job)
+            job_store.save_job(job)
+            restored += 1
+            continue
+        
+        images = job_store.load_spooled_images(job_id)
+        if not images:
+            job.update(
+                images=None,
+                status="failed",
+                error="Job inputs were lost during a server restart",
+                completed_at=current_time
+            )
+            with queue_lock:
+                _track_job_internal(job)
+            job_store.save_job(job)
+            restored += 1
+            continue
+        
+        job.update(images=images, status="queued", processed=0)
+        with queue_cond:
+            _track_job_internal(job)
+            _enqueue_job_internal(job)
+            queue_cond.notify()
+        job_store.save_job(job)
+        requeued += 1
+    
+    print(f"Job store '{job_store.name}': restored {restored} finished jobs, requeued {requeued} jobs")
+
+
+def _schedule_key(job):
+    """Bucket a job is queued under - its user for fair share, a shared one for FIFO"""
+    if SCHEDULER_POLICY == "fair":
+        return job.get("user_id")
+    return "*"
+
+
+def _job_cost(job):
+    """Scheduling cost of a job in pages"""
+    if FAIR_SHARE_BY_SIZE:
+        return max(1, job.get("total_images") or 1)
+    return 1
+
+
+def _enqueue_job_internal(job):
+    """Append a job to its user's queue (internal - no lock)"""
+    global queued_count
+    
+    key = _schedule_key(job)
+    pending = user_queues.get(key)
+    if pending is None:
+        pending = user_queues[key] = deque()
+        user_ring.append(key)
+        user_deficits[key] = FAIR_SHARE_QUANTUM
+        user_enqueued[key] = 0
+        user_dequeued[key] = 0
+        user_live[key] = 0
+    
+    job["queue_seq"] = user_enqueued[key]
+    user_live[key] += 1
+    user_enqueued[key] += 1
+    pending.append(job["id"])
+    queued_count += 1
+    _account_queued_internal(job, 1)
+
+
+def _account_queued_internal(job, sign):
+    """Add (sign=1) or remove (sign=-1) a job's pages and bytes from the budgets"""
+    global queued_pages, queued_bytes
+    
+    pages = job.get("total_images", 0) * sign
+    nbytes = job.get("input_bytes", 0) * sign
+    queued_pages += pages
+    queued_bytes += nbytes
+    
+    user_id = job.get("user_id")
+    usage = user_usage.setdefault(user_id, [0, 0])
+    usage[0] += pages
+    usage[1] += nbytes
+    if usage[0] <= 0:
+        del user_usage[user_id]
+
+
+def _estimate_position_internal(job):
+    """
+    Estimate how many jobs run before this one. Users take turns, so a job
+    with r jobs ahead in its own user's queue waits roughly r rounds.
+    """
+    key = _schedule_key(job)
+    if key not in user_dequeued:
+        return 0
+    rank = max(0, job["queue_seq"] - user_dequeued[key])
+    return min(rank * len(user_ring), max(0, queued_count - 1))
 
 
 def get_job_position(job_id):
-    """Get job position in queue"""
+    """Get job position in queue (constant time, no lock needed)"""
+    job = jobs.get(job_id)
+    if job is None or job["status"] != "queued":
+        return 0
+    try:
+        return _estimate_position_internal(job)
+    except KeyError:
+        # The job was dequeued concurrently
+        return 0
+
+
+def _job_snapshot_internal(job):
+    """Status summary of a job for listings (internal - no lock)"""
+    position = _estimate_position_internal(job) if job["status"] == "queued" else 0
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "position": position,
+        "processed": job["processed"],
+        "total_images": job["total_images"],
+        "eta_seconds": estimate_eta(job, position) if job["status"] not in FINISHED_STATUSES else 0,
+        "file_type": job.get("file_type", "excel"),
+        "file_path": job.get("file_path"),
+        "error": job.get("error"),
+        "chat_id": job.get("chat_id"),
+        "cancel_requested": job.get("cancel_requested", False),
+        "created_at": job["created_at"],
+        "version": job.get("version", 0)
+    }
+
+
+def get_jobs_status(user_id, job_ids=None):
+    """
+    Snapshot the status of many jobs under a single lock acquisition
+    
+    Args:
+        user_id: Only jobs owned by this user (or by nobody) are returned
+        job_ids: Job IDs to look up, or None for all of the user's unfinished jobs
+    
+    Returns:
+        Tuple of (list of job snapshots, list of job IDs not found)
+    """
+    snapshots = []
+    missing = []
+    
     with queue_lock:
-        try:
-            return queue.index(job_id) if job_id in queue else 0
-        except ValueError:
-            return 0
+        if job_ids is None:
+            for job_id in user_jobs.get(user_id, ()):
+                job = jobs[job_id]
+                if job["status"] not in FINISHED_STATUSES:
+                    snapshots.append(_job_snapshot_internal(job))
+        else:
+            for job_id in job_ids:
+                job = jobs.get(job_id)
+                if job is None or (job.get("user_id") and job.get("user_id") != user_id):
+                    missing.append(job_id)
+                else:
+                    snapshots.append(_job_snapshot_internal(job))
+    
+    return snapshots, missing
+
+
+def list_user_jobs(user_id, offset=0, limit=20, status=None):
+    """
+    List a user's jobs, newest first, from the per-user index
+    
+    Args:
+        user_id: Owner of the jobs
+        offset: Number of jobs to skip
+        limit: Max jobs to return
+        status: Only return jobs with this status
+    
+    Returns:
+        Tuple of (list of job snapshots, total matching jobs)
+    """
+    with queue_lock:
+        job_ids = reversed(list(user_jobs.get(user_id, ())))
+        if status is not None:
+            job_ids = [job_id for job_id in job_ids if jobs[job_id]["status"] == status]
+        else:
+            job_ids = list(job_ids)
+        
+        snapshots = [_job_snapshot_internal(jobs[job_id]) for job_id in job_ids[offset:offset + limit]]
+    
+    return snapshots, len(job_ids)
 
 
 def _pop_next_job_internal():
-    """Pop the next job from the queue (internal - no lock)"""
-    if len(queue) == 0:
-        return None
-    return queue.pop(0)
+    """
+    Pop the next job from the queue (internal - no lock).
+    
+    Deficit round-robin over users: each user serves at most one job per
+    turn, and a job only runs once its user has accumulated enough credit
+    (FAIR_SHARE_QUANTUM pages per turn) to pay for its page count. Large
+    batches therefore wait a few rounds while small jobs from other users
+    keep flowing.
+    """
+    global queued_count
+    
+    while user_ring:
+        key = user_ring[0]
+        pending = user_queues[key]
+        job_id = pending[0]
+        job = jobs.get(job_id)
+        
+        if job is None or job["status"] == "cancelled":
+            # Tombstone left by cancel_job - already removed from the counts
+            pending.popleft()
+            user_dequeued[key] += 1
+            if not pending:
+                _drop_user_internal(key)
+            continue
+        
+        cost = _job_cost(job)
+        
+        if len(user_ring) > 1 and user_deficits[key] < cost:
+            user_deficits[key] += FAIR_SHARE_QUANTUM
+            user_ring.rotate(-1)
+            continue
+        
+        pending.popleft()
+        queued_count -= 1
+        _account_queued_internal(job, -1)
+        user_dequeued[key] += 1
+        user_live[key] -= 1
+        
+        if user_live[key] > 0:
+            user_deficits[key] = max(0, user_deficits[key] - cost)
+            user_ring.rotate(-1)
+        else:
+            _drop_user_internal(key)
+        
+        return job_id
+    
+    return None
+
+
+def _drop_user_internal(key):
+    """
+    Remove a user from the ring once it has no live jobs left, discarding any
+    tombstones still in its queue (internal - no lock). Users are normally
+    dropped at the head of the ring; cancel_job drops them from anywhere.
+    """
+    if user_ring[0] == key:
+        user_ring.popleft()
+    else:
+        user_ring.remove(key)
+    del user_queues[key]
+    del user_deficits[key]
+    del user_enqueued[key]
+    del user_dequeued[key]
+    del user_live[key]
+
+
+def cancel_job(job_id):
+    """
+    Cancel a job. A queued job is cancelled immediately: it is marked as a
+    tombstone that the scheduler skips, so removal is O(1). A running job is
+    flagged and its stages stop at the next page or stage boundary.
+    
+    Returns:
+        The job's status after the request ('cancelled' or 'cancelling'), or
+        None if the job does not exist or had already finished
+    """
+    global queued_count
+    
+    with queue_lock:
+        job = jobs.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return None
+        
+        if job["status"] == "queued" and job_id not in ACTIVE_JOBS:
+            queued_count -= 1
+            _account_queued_internal(job, -1)
+            key = _schedule_key(job)
+            user_live[key] -= 1
+            if not user_live[key]:
+                # Only tombstones left - stop counting the user as queued
+                _drop_user_internal(key)
+            job.update(status="cancelled", completed_at=time.time())
+            if job.get("user_id") is not None:
+                _count_active_internal(job["user_id"], -1)
+            result = "cancelled"
+        else:
+            job["cancel_requested"] = True
+            result = "cancelling"
+    
+    _notify_job_changed(job, left_queue=result == "cancelled")
+    job_store.save_job(job)
+    if result == "cancelled":
+        # Outside queue_lock, like a running job finishing its cancellation
+        finish_job(job_id)
+    
+    return result
+
+
+def is_cancel_requested(job_id):
+    """Whether a running job has been asked to stop (constant time, no lock needed)"""
+    job = jobs.get(job_id)
+    return job is None or job.get("cancel_requested", False)
 
 
 def pop_next_job():
@@ -125,52 +731,106 @@ def pop_next_job():
         return _pop_next_job_internal()
 
 
-def get_next_job_for_worker():
+def get_next_job_for_worker(worker_id, timeout=None):
     """
     Atomically get next job for worker processing.
-    Returns job_id if available and no current job, None otherwise.
+    Blocks until a job is queued and the pool has a free slot, so idle workers
+    sleep on the condition instead of polling. Returns job_id, or None if
+    timeout (seconds) elapses first.
     """
-    global CURRENT_JOB
-    with queue_lock:
-        if CURRENT_JOB is not None:
-            return None
-        if len(queue) == 0:
-            return None
-        job_id = queue.pop(0)
-        CURRENT_JOB = job_id
+    with queue_cond:
+        while queued_count == 0 or len(ACTIVE_JOBS) >= OCR_WORKERS:
+            if not queue_cond.wait(timeout):
+                return None
+        job_id = _pop_next_job_internal()
+        ACTIVE_JOBS.add(job_id)
+        state = worker_states.get(worker_id)
+        if state is not None:
+            state.update(state="busy", job_id=job_id, since=time.time())
         return job_id
 
 
-def clear_current_job():
-    """Clear the current job being processed"""
-    global CURRENT_JOB
-    with queue_lock:
-        CURRENT_JOB = None
+def finish_worker_job(worker_id, job_id):
+    """Release a job from the active set and mark the worker idle"""
+    with queue_cond:
+        ACTIVE_JOBS.discard(job_id)
+        queue_cond.notify()
+        state = worker_states.get(worker_id)
+        if state is not None:
+            state.update(
+                state="idle",
+                job_id=None,
+                since=time.time(),
+                jobs_done=state["jobs_done"] + 1
+            )
 
 
-def cleanup_expired_jobs():
-    """Clean up jobs older than JOB_EXPIRY"""
+def cleanup_expired_jobs(max_jobs=EXPIRY_BATCH_SIZE):
+    """
+    Evict jobs older than JOB_EXPIRY, at most max_jobs per call, and delete
+    their output files. Runs frequently so each pass holds the lock briefly.
+    """
     current_time = time.time()
+    expired = []
     
     with queue_lock:
-        expired = [
-            jid for jid, job in jobs.items()
-            if (current_time - job.get("created_at", current_time)) > JOB_EXPIRY
-        ]
-        
-        for jid in expired:
-            del jobs[jid]
+        while expiry_heap and expiry_heap[0][0] <= current_time and len(expired) < max_jobs:
+            _, jid = heapq.heappop(expiry_heap)
+            job = jobs.get(jid)
+            if job is None:
+                continue
+            
+            if job["status"] not in FINISHED_STATUSES:
+                # Never pull a job out from under the scheduler or a pipeline stage
+                heapq.heappush(expiry_heap, (current_time + JOB_EXPIRY, jid))
+                continue
+            
+            _untrack_job_internal(job)
+            expired.append(job)
+    
+    for job in expired:
+        job_store.delete_job(job["id"])
+        remove_download_file(job.get("file_path"))
     
     if expired:
-        print(f"Cleaned up {len(expired)} jobs older than 12 hours")
+        _notify_jobs_deleted([job["id"] for job in expired])
+        print(f"Cleaned up {len(expired)} jobs older than {JOB_EXPIRY // 3600} hours")
+    
+    return len(expired)
+
+
+def sweep_orphaned_downloads():
+    """Remove download files that no live job references"""
+    with queue_lock:
+        referenced = {
+            os.path.normpath(job["file_path"])
+            for job in jobs.values() if job.get("file_path")
+        }
+    
+    removed, freed = sweep_orphaned_files(referenced, min_age=ORPHAN_FILE_AGE)
+    if removed:
+        print(f"Removed {removed} orphaned download files ({freed} bytes)")
+    return removed, freed
 
 
 def get_queue_stats():
     """Get queue statistics"""
     with queue_lock:
         return {
-            "queue_length": len(queue),
+            "queue_length": queued_count,
+            "pending_expiries": len(expiry_heap),
+            "queued_pages": queued_pages,
+            "queued_bytes": queued_bytes,
+            "max_queued_pages": MAX_QUEUED_PAGES,
+            "max_queued_bytes": MAX_QUEUED_BYTES,
+            "queued_users": len(user_ring),
+            "scheduler_policy": SCHEDULER_POLICY,
             "total_jobs": len(jobs),
-            "current_job": CURRENT_JOB,
-            "max_queue_size": MAX_QUEUE_SIZE
+            "active_jobs": list(ACTIVE_JOBS),
+            "max_queue_size": MAX_QUEUE_SIZE,
+            "worker_count": OCR_WORKERS,
+            "workers": [
+                {"worker_id": wid, **state}
+                for wid, state in sorted(worker_states.items())
+            ]
         }
\ No newline at end of file
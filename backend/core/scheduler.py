@@ -2,7 +2,8 @@
 Background Scheduler Service
 """
 from apscheduler.schedulers.background import BackgroundScheduler
-from core.queue_manager import cleanup_expired_jobs
+from config import EXPIRY_SWEEP_INTERVAL, ORPHAN_SWEEP_INTERVAL
+from core.queue_manager import cleanup_expired_jobs, sweep_orphaned_downloads
 
 scheduler = None
 
@@ -15,7 +16,14 @@ def start_scheduler():
     scheduler.add_job(
         cleanup_expired_jobs,
         'interval',
-        hours=12,
+        seconds=EXPIRY_SWEEP_INTERVAL,
+        max_instances=1,
+        coalesce=True
+    )
+    scheduler.add_job(
+        sweep_orphaned_downloads,
+        'interval',
+        seconds=ORPHAN_SWEEP_INTERVAL,
         max_instances=1,
         coalesce=True
     )
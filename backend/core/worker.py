@@ -2,192 +2,385 @@
 Background Worker Service
 """
 import time
+import queue
 import threading
-import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from ml.ocr import run_ocr, run_ocr_enhanced
+from ml.ocr import run_ocr, run_ocr_enhanced, run_ocr_batched
 from ml.kolosal_ocr import run_ocr_kolosal, format_kolosal_result_for_file
+from config import (
+    OCR_WORKERS, OCR_PAGE_WORKERS, OCR_BATCH_MAX_SIZE, KOLOSAL_OCR_MAX_INFLIGHT,
+    FORMAT_WORKERS, CONVERT_WORKERS, STAGE_QUEUE_SIZE
+)
 from core.queue_manager import (
-    get_job, update_job,
-    get_next_job_for_worker, clear_current_job
+    get_job, update_job, register_worker, is_cancel_requested,
+    get_next_job_for_worker, finish_worker_job, recover_jobs, finish_job
 )
+from core.eta import record_job
+from core.job_store import read_page_bytes
+from core.ocr_cache import cached_ocr
 from utils.ai_formatter import parse_json_from_response
 from services.chat_service import format_text_via_chat, save_ocr_result_to_chat
 from services.file_converter_service import convert_to_excel, convert_to_pdf
 
+# Shared pool that batch pages fan out to. Page threads decode their page and then
+# wait on the OCR micro-batcher, so a job needs at least OCR_BATCH_MAX_SIZE pages in
+# flight for full batches; the threads are idle while waiting, so this is cheap.
+PAGE_WINDOW = max(OCR_PAGE_WORKERS, OCR_BATCH_MAX_SIZE)
+page_executor = ThreadPoolExecutor(max_workers=PAGE_WINDOW, thread_name_prefix="ocr-page")
+
+# Kolosal pages are pure network I/O, so they get their own pool sized by the
+# in-flight request limit rather than by CPU count
+kolosal_executor = ThreadPoolExecutor(max_workers=KOLOSAL_OCR_MAX_INFLIGHT, thread_name_prefix="kolosal-page")
+
+# Bounded hand-off queues between pipeline stages. OCR workers move on to the next
+# job as soon as they enqueue a finished OCR result; a full queue blocks them,
+# which keeps OCR from running arbitrarily far ahead of formatting/conversion.
+format_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+convert_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+
+
+class JobCancelledError(Exception):
+    """Raised inside a pipeline stage when its job has been cancelled"""
+
+
+def check_cancelled(job_id):
+    """Stop the current stage if the job's owner cancelled it"""
+    if is_cancel_requested(job_id):
+        raise JobCancelledError(job_id)
+
+
+def run_pages(job_id, images, ocr_page, executor=page_executor, window=PAGE_WINDOW):
+    """
+    Run ocr_page on every page of a batch using a shared page pool.
+    
+    Each job keeps at most `window` pages in flight so concurrent jobs
+    interleave on the pool instead of queueing behind one large batch.
+    Results come back in page order and progress is updated as pages finish.
+    """
+    results = [None] * len(images)
+    in_flight = {}
+    next_page = 0
+    processed = 0
+    
+    try:
+        while next_page < len(images) or in_flight:
+            while next_page < len(images) and len(in_flight) < window:
+                future = executor.submit(ocr_page, images[next_page])
+                in_flight[future] = next_page
+                next_page += 1
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[in_flight.pop(future)] = future.result()
+                processed += 1
+            update_job(job_id, processed=processed)
+            
+            # Cooperative abort between pages
+            check_cancelled(job_id)
+    finally:
+        # Only reached with pages left when a page failed or the job was cancelled
+        for future in in_flight:
+            future.cancel()
+    
+    return results
+
+
+def ocr_page(source, engine, options, ocr_image, tiled=False):
+    """
+    OCR one queued page, answering from the OCR cache when the same image was
+    already processed with the same engine and options. Pages are only decoded
+    while in flight, and cache hits are never decoded at all.
+    """
+    return cached_ocr(read_page_bytes(source), engine, options, ocr_image, tiled)
 
-def process_job(job_id):
-    """Process a single OCR job"""
+
+def run_ocr_stage(job_id):
+    """
+    Stage 1: OCR every page of a job
+    
+    Returns:
+        Pipeline context dict for the following stages, or None if the job is gone
+    """
     job = get_job(job_id)
     if job is None:
-        return
+        return None
     
     started_at = time.time()
     update_job(job_id, status="processing", started_at=started_at)
     
+    use_enhanced = job.get("use_enhanced", False)
+    ocr_options = job.get("ocr_options", {})
+    images = job["images"]
+    job_type = job["type"]
+    engine = job.get("engine", "paddleocr")  # Get engine from job
+    
     ocr_results = []
+    kolosal_titles = []
     
-    try:
-        use_enhanced = job.get("use_enhanced", False)
-        ocr_options = job.get("ocr_options", {})
-        images = job["images"]
-        job_type = job["type"]
-        file_type = job.get("file_type", "excel")
-        user_id = job.get("user_id")
-        engine = job.get("engine", "paddleocr")  # Get engine from job
-        
-        # Step 1: OCR Processing
-        if engine == "kolosalocr":
-            kolosal_titles = []
-            
-            if job_type == "single":
-                image = images[0]
-                kolosal_result = run_ocr_kolosal(image, ocr_options)
-                formatted = format_kolosal_result_for_file(kolosal_result)
-                ocr_results.append(formatted)
+    if engine == "kolosalocr":
+        if job_type == "single":
+            kolosal_result = ocr_page(
+                images[0], engine, ocr_options,
+                lambda image: run_ocr_kolosal(image, ocr_options)
+            )
+            formatted = format_kolosal_result_for_file(kolosal_result)
+            ocr_results.append(formatted)
+            kolosal_titles.append(kolosal_result.get("title"))
+        elif job_type == "batch":
+            kolosal_pages = run_pages(
+                job_id, images,
+                lambda page: ocr_page(
+                    page, engine, ocr_options,
+                    lambda image: run_ocr_kolosal(image, ocr_options)
+                ),
+                executor=kolosal_executor,
+                window=KOLOSAL_OCR_MAX_INFLIGHT
+            )
+            for kolosal_result in kolosal_pages:
+                ocr_results.append(format_kolosal_result_for_file(kolosal_result))
                 kolosal_titles.append(kolosal_result.get("title"))
-            elif job_type == "batch":
-                processed = 0
-                for img in images:
-                    kolosal_result = run_ocr_kolosal(img, ocr_options)
-                    formatted = format_kolosal_result_for_file(kolosal_result)
-                    ocr_results.append(formatted)
-                    kolosal_titles.append(kolosal_result.get("title"))
-                    processed += 1
-                    update_job(job_id, processed=processed)
-            
-            normalized_results = ocr_results
-            chat_id = None
-            
-            if user_id:
-                combined_result = "\n\n--- Page Break ---\n\n".join(
-                    [str(r) if isinstance(r, dict) else r for r in ocr_results]
+    else:
+        # PaddleOCR processing
+        # Enhanced results are cached separately from plain ones
+        variant = "paddleocr-enhanced" if use_enhanced else "paddleocr"
+        
+        if job_type == "single":
+            if use_enhanced:
+                result = ocr_page(
+                    images[0], variant, ocr_options,
+                    lambda image: run_ocr_enhanced(image, ocr_options),
+                    tiled=True
                 )
-                ocr_title = next((t for t in kolosal_titles if t), None)
-                chat_result = save_ocr_result_to_chat(user_id, combined_result, title=ocr_title, engine=engine)
-                if "error" not in chat_result:
-                    chat_id = chat_result.get("chat_id")
-                else:
-                    print(f"Failed to save OCR to chat: {chat_result.get('error')}")
-            
-        else:
-            # PaddleOCR processing
-            if job_type == "single":
-                image = images[0]
-                if use_enhanced:
-                    result = run_ocr_enhanced(image, ocr_options)
-                else:
-                    result = run_ocr(image)
-                ocr_results.append(result)
-                
-            elif job_type == "batch":
-                processed = 0
-                for img in images:
-                    if use_enhanced:
-                        out = run_ocr_enhanced(img, ocr_options)
-                    else:
-                        out = run_ocr(img)
-                    ocr_results.append(out)
-                    processed += 1
-                    update_job(job_id, processed=processed)
-            
-            # Step 2: Format with AI via Chat Service (only for PaddleOCR)
-            update_job(job_id, status="formatting")
-            normalized_results = []
-            chat_id = None
+            else:
+                result = ocr_page(images[0], variant, None, run_ocr, tiled=True)
+            ocr_results.append(result)
             
-            # Combine all OCR results into one text for formatting
-            combined_text = "\n\n--- Page Break ---\n\n".join(ocr_results)
+        elif job_type == "batch":
+            ocr_results = run_pages(
+                job_id, images,
+                lambda page: ocr_page(
+                    page, variant, ocr_options if use_enhanced else None,
+                    lambda image: run_ocr_batched(image, enhanced=use_enhanced),
+                    tiled=True
+                )
+            )
+    
+    return {
+        "job_id": job_id,
+        "engine": engine,
+        "user_id": job.get("user_id"),
+        "file_type": job.get("file_type", "excel"),
+        "pages": len(images),
+        "ocr_results": ocr_results,
+        "kolosal_titles": kolosal_titles,
+        "started_at": started_at,
+        "ocr_done": time.time()
+    }
+
+
+def run_format_stage(ctx):
+    """Stage 2: save Kolosal results to chat, or format PaddleOCR text with AI"""
+    job_id = ctx["job_id"]
+    engine = ctx["engine"]
+    user_id = ctx["user_id"]
+    ocr_results = ctx["ocr_results"]
+    
+    check_cancelled(job_id)
+    ctx["format_started"] = time.time()
+    update_job(job_id, status="formatting")
+    chat_id = None
+    
+    if engine == "kolosalocr":
+        normalized_results = ocr_results
+        
+        if user_id:
+            combined_result = "\n\n--- Page Break ---\n\n".join(
+                [str(r) if isinstance(r, dict) else r for r in ocr_results]
+            )
+            ocr_title = next((t for t in ctx["kolosal_titles"] if t), None)
+            chat_result = save_ocr_result_to_chat(user_id, combined_result, title=ocr_title, engine=engine)
+            if "error" not in chat_result:
+                chat_id = chat_result.get("chat_id")
+            else:
+                print(f"Failed to save OCR to chat: {chat_result.get('error')}")
+    else:
+        # Format with AI via Chat Service (only for PaddleOCR)
+        normalized_results = []
+        
+        # Combine all OCR results into one text for formatting
+        combined_text = "\n\n--- Page Break ---\n\n".join(ocr_results)
+        
+        if user_id:
+            chat_result = format_text_via_chat(user_id, combined_text)
             
-            if user_id:
-                chat_result = format_text_via_chat(user_id, combined_text)
+            if "error" not in chat_result:
+                chat_id = chat_result.get("chat_id")
+                ai_response = chat_result.get("response", "")
                 
-                if "error" not in chat_result:
-                    chat_id = chat_result.get("chat_id")
-                    ai_response = chat_result.get("response", "")
-                    
-                    # Parse JSON from response
-                    parsed = parse_json_from_response(ai_response)
-                    normalized_results.append(parsed)
-                else:
-                    print(f"Chat formatting failed: {chat_result.get('error')}")
-                    for text in ocr_results:
-                        normalized_results.append({"data": text, "is_json": False})
+                # Parse JSON from response
+                parsed = parse_json_from_response(ai_response)
+                normalized_results.append(parsed)
             else:
+                print(f"Chat formatting failed: {chat_result.get('error')}")
                 for text in ocr_results:
                     normalized_results.append({"data": text, "is_json": False})
-        
-        # Step 3: Convert to file
-        update_job(job_id, status="converting")
-        if file_type == "pdf":
-            file_path = convert_to_pdf(normalized_results, job_id)
         else:
-            file_path = convert_to_excel(normalized_results, job_id)
-        
-        completed_at = time.time()
-        process_time = completed_at - started_at
-        
-        update_job(
-            job_id,
-            result=normalized_results,
-            file_path=file_path,
-            file_type=file_type,
-            chat_id=chat_id,
-            status="done",
-            completed_at=completed_at
-        )
-        
-        print(f"Job {job_id} ({engine}) completed in {process_time:.2f}s - File: {file_path} - Chat: {chat_id}")
-        
-    except Exception as e:
-        update_job(
-            job_id,
-            status="failed",
-            error=str(e),
-            completed_at=time.time()
-        )
-        print(f"Job {job_id} failed: {str(e)}")
+            for text in ocr_results:
+                normalized_results.append({"data": text, "is_json": False})
+    
+    ctx["normalized_results"] = normalized_results
+    ctx["chat_id"] = chat_id
+    ctx["format_done"] = time.time()
+    return ctx
+
+
+def run_convert_stage(ctx):
+    """Stage 3: convert the normalized results to the output file"""
+    job_id = ctx["job_id"]
+    engine = ctx["engine"]
+    file_type = ctx["file_type"]
+    normalized_results = ctx["normalized_results"]
     
-    # Clear images from memory
-    update_job(job_id, images=None)
+    check_cancelled(job_id)
+    convert_started = time.time()
+    update_job(job_id, status="converting")
+    if file_type == "pdf":
+        file_path = convert_to_pdf(normalized_results, job_id)
+    else:
+        file_path = convert_to_excel(normalized_results, job_id)
     
-    # Send webhook if configured
-    webhook = job.get("webhook")
-    if webhook:
-        try:
-            requests.post(
-                webhook,
-                json={
-                    "job_id": job_id, 
-                    "status": "done", 
-                    "file_type": job.get("file_type"),
-                    "engine": job.get("engine"),
-                    "chat_id": job.get("chat_id")
-                },
-                timeout=3
-            )
-        except:
-            pass
+    completed_at = time.time()
+    process_time = completed_at - ctx["started_at"]
+    
+    record_job(
+        engine, ctx["pages"],
+        ocr_seconds=ctx["ocr_done"] - ctx["started_at"],
+        stage_seconds={
+            "formatting": ctx["format_done"] - ctx["format_started"],
+            "converting": completed_at - convert_started
+        },
+        total_seconds=process_time
+    )
+    
+    update_job(
+        job_id,
+        result=normalized_results,
+        file_path=file_path,
+        file_type=file_type,
+        chat_id=ctx["chat_id"],
+        status="done",
+        completed_at=completed_at
+    )
+    
+    print(f"Job {job_id} ({engine}) completed in {process_time:.2f}s - File: {file_path} - Chat: {ctx['chat_id']}")
+
+
+def fail_job(job_id, error):
+    """Mark a job as failed (or cancelled) at whichever stage it was in"""
+    if isinstance(error, JobCancelledError):
+        update_job(job_id, status="cancelled", completed_at=time.time())
+        print(f"Job {job_id} cancelled")
+        return
+    
+    update_job(
+        job_id,
+        status="failed",
+        error=str(error),
+        completed_at=time.time()
+    )
+    print(f"Job {job_id} failed: {str(error)}")
 
 
-def worker():
-    """Background worker thread function"""
+def worker(worker_id):
+    """Background OCR worker thread function (pipeline stage 1)"""
+    register_worker(worker_id)
+    
     while True:
-        time.sleep(0.05)
-        
-        job_id = get_next_job_for_worker()
+        # Blocks until create_job signals a new job
+        job_id = get_next_job_for_worker(worker_id)
         if job_id is None:
             continue
         
+        ctx = None
         try:
-            process_job(job_id)
+            ctx = run_ocr_stage(job_id)
+        except Exception as e:
+            fail_job(job_id, e)
+            finish_job(job_id)
         finally:
-            clear_current_job()
+            finish_worker_job(worker_id, job_id)
+        
+        if ctx is not None:
+            # Blocks while the formatting stage is saturated
+            format_queue.put(ctx)
+
+
+def format_worker():
+    """Formatting stage thread function (pipeline stage 2)"""
+    while True:
+        ctx = format_queue.get()
+        try:
+            ctx = run_format_stage(ctx)
+        except Exception as e:
+            fail_job(ctx["job_id"], e)
+            finish_job(ctx["job_id"])
+            continue
+        
+        convert_queue.put(ctx)
+
+
+def convert_worker():
+    """Conversion stage thread function (pipeline stage 3)"""
+    while True:
+        ctx = convert_queue.get()
+        try:
+            run_convert_stage(ctx)
+        except Exception as e:
+            fail_job(ctx["job_id"], e)
+        finish_job(ctx["job_id"])
+
+
+def get_pipeline_stats():
+    """Get the depth of each pipeline stage queue"""
+    return {
+        "format_queue_depth": format_queue.qsize(),
+        "convert_queue_depth": convert_queue.qsize(),
+        "stage_queue_size": STAGE_QUEUE_SIZE,
+        "format_workers": FORMAT_WORKERS,
+        "convert_workers": CONVERT_WORKERS
+    }
+
+
+def _start_threads(target, count, name):
+    """Start `count` daemon threads running target"""
+    threads = []
+    for idx in range(count):
+        thread = threading.Thread(target=target, name=f"{name}-{idx}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
 
 
 def start_worker():
-    """Start the background worker thread"""
-    worker_thread = threading.Thread(target=worker, daemon=True)
-    worker_thread.start()
-    print("Background worker started")
-    return worker_thread
+    """Start the OCR worker pool and the formatting/conversion stage threads"""
+    # Requeue jobs persisted by a previous run before any worker starts
+    recover_jobs()
+    
+    worker_threads = []
+    for worker_id in range(OCR_WORKERS):
+        worker_thread = threading.Thread(
+            target=worker,
+            args=(worker_id,),
+            name=f"ocr-worker-{worker_id}",
+            daemon=True
+        )
+        worker_thread.start()
+        worker_threads.append(worker_thread)
+    
+    worker_threads += _start_threads(format_worker, FORMAT_WORKERS, "format-worker")
+    worker_threads += _start_threads(convert_worker, CONVERT_WORKERS, "convert-worker")
+    
+    print(f"Background worker pool started ({OCR_WORKERS} OCR, {FORMAT_WORKERS} formatting, "
+          f"{CONVERT_WORKERS} conversion workers)")
+    return worker_threads
@@ -20,6 +20,7 @@ def create_tables_sqlite():
     
     conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
     
     print(f"Creating SQLite tables in database: {DATABASE_PATH}")
     
@@ -66,6 +67,18 @@ def create_tables_sqlite():
     ''')
     print("  - Created 'chat_messages' table")
     
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            status TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    print("  - Created 'ocr_jobs' table")
+    
     # Create indexes for faster lookups
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
@@ -74,6 +87,7 @@ def create_tables_sqlite():
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chats_chat_id ON chats(chat_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_chat_id ON chat_messages(chat_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_order ON chat_messages(chat_id, message_order)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs(status)')
     print("  - Created indexes")
     
     conn.commit()
@@ -139,6 +153,18 @@ def create_tables_postgresql():
     ''')
     print("  - Created 'chat_messages' table")
     
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            status TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at DOUBLE PRECISION NOT NULL,
+            updated_at DOUBLE PRECISION NOT NULL
+        )
+    ''')
+    print("  - Created 'ocr_jobs' table")
+    
     # Create indexes for faster lookups
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
@@ -147,6 +173,7 @@ def create_tables_postgresql():
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chats_chat_id ON chats(chat_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_chat_id ON chat_messages(chat_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_order ON chat_messages(chat_id, message_order)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs(status)')
     print("  - Created indexes")
     
     conn.commit()
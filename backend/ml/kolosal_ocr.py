@@ -6,8 +6,14 @@ import mimetypes
 import requests
 from io import BytesIO
 from PIL import Image
+from requests.adapters import HTTPAdapter
 
-from config import KOLOSAL_OCR_API_KEY, KOLOSAL_OCR_API_URL
+from config import KOLOSAL_OCR_API_KEY, KOLOSAL_OCR_API_URL, KOLOSAL_OCR_MAX_INFLIGHT
+
+# Shared session so concurrent batch pages reuse keep-alive connections
+# instead of paying a TCP/TLS handshake per page
+kolosal_session = requests.Session()
+kolosal_session.mount("https://", HTTPAdapter(pool_maxsize=KOLOSAL_OCR_MAX_INFLIGHT))
 
 
 def run_ocr_kolosal(image: Image.Image, options: dict = None) -> dict:
@@ -50,7 +56,7 @@ def run_ocr_kolosal(image: Image.Image, options: dict = None) -> dict:
         payload["custom_schema"] = options["custom_schema"]
     
     try:
-        response = requests.post(
+        response = kolosal_session.post(
             KOLOSAL_OCR_API_URL,
             headers={
                 "Authorization": f"Bearer {KOLOSAL_OCR_API_KEY}",
@@ -1,16 +1,26 @@
 """
 PaddleOCR Model and Processing Functions
 """
+import time
 import logging
+import multiprocessing
+import threading
 import numpy as np
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from PIL import Image
 import os
 
 from config import (
     OCR_LANG, OCR_DEVICE, TEXT_DET_THRESH,
     TEXT_DET_BOX_THRESH, TEXT_RECOGNITION_BATCH_SIZE,
-    MAX_IMAGE_DIMENSION
+    MAX_IMAGE_DIMENSION, OCR_PROCESS_WORKERS, OCR_BATCH_MAX_SIZE, OCR_BATCH_MAX_LATENCY,
+    OCR_PREPROCESS, OCR_CROP_TOLERANCE, OCR_CROP_MARGIN,
+    OCR_TILING, OCR_TILE_ASPECT, OCR_TILE_SIZE, OCR_TILE_OVERLAP,
+    OCR_BACKEND, OCR_CPU_THREADS, OCR_PRECISION,
+    OCR_INT8_DET_MODEL_DIR, OCR_INT8_REC_MODEL_DIR, OCR_INT8_DET_MODEL_NAME, OCR_INT8_REC_MODEL_NAME
 )
+from utils.helpers import capped_size
 
 # Disable PaddleOCR verbose logging
 logging.getLogger('ppocr').setLevel(logging.ERROR)
@@ -19,10 +29,121 @@ logging.getLogger('ppstructure').setLevel(logging.ERROR)
 # Global OCR instance - loaded once at startup
 paddle_ocr = None
 
+# (backend, precision) the model was actually loaded with, which differs from
+# OCR_BACKEND/OCR_PRECISION when loading fell back. None until a model is loaded.
+ocr_setup = None
+
+# The Paddle predictor is not safe for concurrent calls from several worker threads
+paddle_lock = threading.Lock()
+
+# Pool of OCR worker processes - only used in "process" execution mode
+ocr_process_pool = None
+
+# Micro-batcher: pages of batch jobs wait here (as (arrival, img_array, future))
+# until a full batch is collected or the oldest page has waited OCR_BATCH_MAX_LATENCY
+batch_pending = deque()
+batch_cond = threading.Condition()
+batch_thread = None
+batch_stats = {"batches": 0, "pages": 0, "tiled_pages": 0, "tiles": 0}
+
+# Inference backends for the PP-OCR models on CPU. "paddle" is the stock Paddle
+# Inference runtime; the others go through PaddleOCR's high-performance inference
+# plugin (paddleocr install_hpi_deps cpu), which converts the models to ONNX.
+OCR_BACKENDS = ("paddle", "onnxruntime", "openvino")
+
+# Model precisions: stock FP32 models or INT8-quantized detection/recognition models
+OCR_PRECISIONS = ("fp32", "int8")
+
+# Pipeline modules that run on the selected backend
+OCR_MODULES = ("TextDetection", "TextLineOrientation", "TextRecognition")
+
+# ITU-R BT.601 luma weights for RGB -> grayscale, in 1/256 fixed point
+GRAY_WEIGHTS = (77, 150, 29)
+
+# Steps accepted in OCR_PREPROCESS
+PREPROCESS_STEPS = ("grayscale", "contrast", "crop", "binarize")
+
+
+def check_preprocess_steps(steps):
+    """Raise ValueError for preprocessing steps this module does not know"""
+    unknown = [step for step in steps if step not in PREPROCESS_STEPS]
+    if unknown:
+        raise ValueError(
+            f"Unknown OCR_PREPROCESS step(s) {', '.join(unknown)}, expected any of: {', '.join(PREPROCESS_STEPS)}"
+        )
+
+
+check_preprocess_steps(OCR_PREPROCESS)
+
+
+def _backend_options(backend: str) -> dict:
+    """PaddleOCR constructor arguments selecting an inference backend"""
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{backend}', expected one of: {', '.join(OCR_BACKENDS)}")
+    
+    # Thread counts are only passed when configured so each runtime keeps its own default
+    if backend == "paddle":
+        return {"cpu_threads": OCR_CPU_THREADS} if OCR_CPU_THREADS else {}
+    
+    hpi_config = {"backend": backend}
+    if OCR_CPU_THREADS:
+        hpi_config["backend_config"] = {"cpu_num_threads": OCR_CPU_THREADS}
+    return {
+        "enable_hpi": True,
+        "paddlex_config": {
+            "SubModules": {module: {"hpi_config": hpi_config} for module in OCR_MODULES}
+        }
+    }
+
+
+def _precision_options(precision: str) -> dict:
+    """PaddleOCR constructor arguments selecting the model precision"""
+    if precision not in OCR_PRECISIONS:
+        raise ValueError(f"Unknown OCR precision '{precision}', expected one of: {', '.join(OCR_PRECISIONS)}")
+    
+    if precision == "fp32":
+        return {}
+    
+    for model_dir in (OCR_INT8_DET_MODEL_DIR, OCR_INT8_REC_MODEL_DIR):
+        if not os.path.isdir(model_dir):
+            raise FileNotFoundError(f"INT8 model directory not found: {model_dir}")
+    
+    return {
+        "text_detection_model_name": OCR_INT8_DET_MODEL_NAME,
+        "text_detection_model_dir": OCR_INT8_DET_MODEL_DIR,
+        "text_recognition_model_name": OCR_INT8_REC_MODEL_NAME,
+        "text_recognition_model_dir": OCR_INT8_REC_MODEL_DIR
+    }
+
+
+def create_ocr_model(backend: str = OCR_BACKEND, precision: str = OCR_PRECISION):
+    """
+    Build a PaddleOCR pipeline running on the given inference backend
+    
+    Args:
+        backend: One of OCR_BACKENDS
+        precision: One of OCR_PRECISIONS
+    
+    Returns:
+        PaddleOCR instance
+    """
+    from paddleocr import PaddleOCR
+    
+    return PaddleOCR(
+        use_textline_orientation=True,
+        lang=OCR_LANG,
+        device=OCR_DEVICE,
+        text_det_thresh=TEXT_DET_THRESH,
+        text_det_box_thresh=TEXT_DET_BOX_THRESH,
+        text_recognition_batch_size=TEXT_RECOGNITION_BATCH_SIZE,
+        **_backend_options(backend),
+        **_precision_options(precision)
+    )
+
 
 def load_ocr_model():
     """Load and initialize PaddleOCR model - called once at startup"""
-    global paddle_ocr
+    global paddle_ocr, ocr_setup
     
     if paddle_ocr is not None:
         return paddle_ocr
@@ -40,18 +161,27 @@ def load_ocr_model():
         print("PaddleOCR not installed. Please install: pip install paddlepaddle paddleocr")
         raise
     
+    # Requested setup first, then drop INT8, then the alternative backend
+    candidates = [(OCR_BACKEND, OCR_PRECISION), (OCR_BACKEND, "fp32"), ("paddle", "fp32")]
+    candidates = list(dict.fromkeys(candidates))
+    
     try:
-        paddle_ocr = PaddleOCR(
-            use_textline_orientation=True,
-            lang='id',
-            device='cpu',
-            text_det_thresh=0.3,
-            text_det_box_thresh=0.5,
-            text_recognition_batch_size=6,
-        )
+        for index, (backend, precision) in enumerate(candidates):
+            try:
+                paddle_ocr = create_ocr_model(backend, precision)
+                ocr_setup = (backend, precision)
+                break
+            except Exception as e:
+                if index == len(candidates) - 1:
+                    raise
+                print(f"Failed to load PaddleOCR ({backend}, {precision}): {str(e)}")
+                print(f"Falling back to {candidates[index + 1][0]}, {candidates[index + 1][1]}...")
+        
         print("PaddleOCR model loaded successfully")
         print(f"   - Language: {OCR_LANG}")
         print(f"   - Device: CPU")
+        print(f"   - Backend: {backend}")
+        print(f"   - Precision: {precision}")
         
     except Exception as e:
         print(f"Failed to load PaddleOCR with full params: {str(e)}")
@@ -59,6 +189,7 @@ def load_ocr_model():
         
         try:
             paddle_ocr = PaddleOCR(lang=OCR_LANG, use_gpu=False, show_log=False)
+            ocr_setup = ("paddle", "fp32")
             print("PaddleOCR loaded with minimal parameters")
         except Exception as e2:
             print(f"Failed to load PaddleOCR: {str(e2)}")
@@ -67,28 +198,388 @@ def load_ocr_model():
     return paddle_ocr
 
 
-def run_ocr_paddleocr(image: Image.Image, detail: int = 0, lang: str = 'en'):
+def get_ocr_setup():
+    """(backend, precision) of the loaded model, or None if none is loaded"""
+    return ocr_setup
+
+
+def _init_ocr_process():
+    """Process pool initializer - loads PaddleOCR once per worker process"""
+    load_ocr_model()
+
+
+def start_ocr_process_pool():
+    """Start the OCR worker processes - each one loads its model on start"""
+    global ocr_process_pool, ocr_setup
+    
+    if ocr_process_pool is not None:
+        return ocr_process_pool
+    
+    print(f"Starting OCR process pool ({OCR_PROCESS_WORKERS} processes)...")
+    
+    # Spawn instead of fork so children never inherit the Flask threads or locks
+    ocr_process_pool = ProcessPoolExecutor(
+        max_workers=OCR_PROCESS_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_ocr_process
+    )
+    
+    # One task per process spawns all of them now instead of lazily on the first jobs.
+    # The processes report the setup they loaded, which may have fallen back.
+    setups = [ocr_process_pool.submit(get_ocr_setup) for _ in range(OCR_PROCESS_WORKERS)]
+    setups = list(dict.fromkeys(future.result() for future in setups))
+    if len(setups) > 1:
+        print(f"OCR processes loaded different setups: {setups}")
+    ocr_setup = setups[0]
+    
+    print(f"OCR process pool ready ({ocr_setup[0]}, {ocr_setup[1]})")
+    return ocr_process_pool
+
+
+def shutdown_ocr_process_pool():
+    """Stop the OCR worker processes"""
+    global ocr_process_pool
+    
+    if ocr_process_pool is not None:
+        ocr_process_pool.shutdown(wait=False, cancel_futures=True)
+        ocr_process_pool = None
+
+
+def _model_input(img_array: np.ndarray) -> np.ndarray:
     """
-    PaddleOCR processing function
+    Expand a grayscale array to the three channels the detection model takes.
+    Done right before inference so queued pages, tiles and arrays sent to OCR
+    processes stay single-channel.
     """
-    global paddle_ocr
+    if img_array.ndim == 2:
+        return np.repeat(img_array[:, :, np.newaxis], 3, axis=2)
+    return img_array
+
+
+def _paddle_infer(img_array: np.ndarray) -> list:
+    """Run PaddleOCR on one image array and return the recognized text lines"""
+    img_array = _model_input(img_array)
+    with paddle_lock:
+        result = paddle_ocr.ocr(img_array)
     
-    img_array = np.array(image)
+    if result is None or len(result) == 0:
+        return []
     
-    try:
-        result = paddle_ocr.ocr(img_array)
+    if isinstance(result, list) and len(result) > 0:
+        if isinstance(result[0], list) and len(result[0]) > 0:
+            result = result[0]
+    
+    if not result:
+        return []
+    
+    return list(result[0]["rec_texts"])
+
+
+def _paddle_infer_batch(img_arrays: list) -> list:
+    """
+    Run PaddleOCR on several image arrays in one call
+    
+    Returns:
+        Per image, a list of (text, top, bottom) lines; top/bottom are the
+        line's vertical extent, or None if the result carried no boxes
+    """
+    img_arrays = [_model_input(img_array) for img_array in img_arrays]
+    with paddle_lock:
+        results = paddle_ocr.ocr(img_arrays)
+    
+    lines = [[] for _ in img_arrays]
+    for index, result in enumerate(results or []):
+        if not result:
+            continue
+        texts = list(result["rec_texts"])
+        boxes = result.get("rec_boxes")
+        if boxes is not None and len(boxes) == len(texts):
+            lines[index] = [(text, float(box[1]), float(box[3])) for text, box in zip(texts, boxes)]
+        else:
+            lines[index] = [(text, None, None) for text in texts]
+    return lines
+
+
+def _resolve_batch(futures, lines=None, error=None):
+    """Hand each image of a finished batch its lines"""
+    if error is not None:
+        print(f"PaddleOCR batch processing error: {str(error)}")
+    for index, future in enumerate(futures):
+        future.set_result(lines[index] if lines else [])
+
+
+def _ocr_batcher_loop():
+    """Collect pending pages into batches and run them"""
+    # In process mode keep one batch per OCR process in flight; in-process
+    # inference is serialized anyway, so run batches inline one at a time
+    slots = threading.Semaphore(OCR_PROCESS_WORKERS if ocr_process_pool is not None else 1)
+    
+    while True:
+        with batch_cond:
+            while not batch_pending:
+                batch_cond.wait()
+            
+            deadline = batch_pending[0][0] + OCR_BATCH_MAX_LATENCY
+            while len(batch_pending) < OCR_BATCH_MAX_SIZE:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                batch_cond.wait(remaining)
+            
+            batch = [batch_pending.popleft() for _ in range(min(OCR_BATCH_MAX_SIZE, len(batch_pending)))]
+            batch_stats["batches"] += 1
+            batch_stats["pages"] += len(batch)
         
-        if result is None or len(result) == 0:
-            return "" if detail == 0 else []
+        img_arrays = [img_array for _, img_array, _ in batch]
+        futures = [future for _, _, future in batch]
         
-        if isinstance(result, list) and len(result) > 0:
-            if isinstance(result[0], list) and len(result[0]) > 0:
-                result = result[0]
+        slots.acquire()
+        if ocr_process_pool is not None:
+            def on_done(result, futures=futures):
+                slots.release()
+                if result.exception() is not None:
+                    _resolve_batch(futures, error=result.exception())
+                else:
+                    _resolve_batch(futures, result.result())
+            
+            try:
+                ocr_process_pool.submit(_paddle_infer_batch, img_arrays).add_done_callback(on_done)
+            except Exception as e:
+                slots.release()
+                _resolve_batch(futures, error=e)
+        else:
+            try:
+                _resolve_batch(futures, _paddle_infer_batch(img_arrays))
+            except Exception as e:
+                _resolve_batch(futures, error=e)
+            finally:
+                slots.release()
+
+
+def submit_ocr_batched(img_array: np.ndarray) -> Future:
+    """
+    Queue one preprocessed image array for batched PaddleOCR inference
+    
+    Returns:
+        Future resolving to the image's (text, top, bottom) lines
+    """
+    global batch_thread
+    
+    future = Future()
+    with batch_cond:
+        if batch_thread is None:
+            batch_thread = threading.Thread(target=_ocr_batcher_loop, name="ocr-batcher", daemon=True)
+            batch_thread.start()
+        batch_pending.append((time.time(), img_array, future))
+        batch_cond.notify()
+    return future
+
+
+def get_ocr_batch_stats():
+    """Get micro-batcher metrics"""
+    with batch_cond:
+        stats = dict(batch_stats)
+    batches = stats["batches"]
+    return {
+        "max_batch_size": OCR_BATCH_MAX_SIZE,
+        "max_latency": OCR_BATCH_MAX_LATENCY,
+        "batches": batches,
+        "pages": stats["pages"],
+        "avg_batch_size": round(stats["pages"] / batches, 2) if batches else None,
+        "tiling": OCR_TILING,
+        "tiled_pages": stats["tiled_pages"],
+        "tiles": stats["tiles"]
+    }
+
+
+def _to_grayscale(img_array: np.ndarray) -> np.ndarray:
+    """RGB array to uint8 luma, in 16-bit integer arithmetic"""
+    if img_array.ndim == 2:
+        return img_array
+    gray = img_array[:, :, 0] * np.uint16(GRAY_WEIGHTS[0])
+    gray += img_array[:, :, 1] * np.uint16(GRAY_WEIGHTS[1])
+    gray += img_array[:, :, 2] * np.uint16(GRAY_WEIGHTS[2])
+    gray += 128
+    return (gray >> 8).astype(np.uint8)
+
+
+def _stretch_contrast(gray: np.ndarray) -> np.ndarray:
+    """Map the 1st..99th intensity percentiles onto 0..255 through a lookup table"""
+    cdf = np.cumsum(np.bincount(gray.ravel(), minlength=256))
+    low = int(np.searchsorted(cdf, 0.01 * cdf[-1]))
+    high = int(np.searchsorted(cdf, 0.99 * cdf[-1]))
+    if high - low < 32:
+        # Nearly uniform image - stretching would only amplify noise
+        return gray
+    
+    levels = np.arange(256, dtype=np.float32)
+    lut = np.clip((levels - low) * (255.0 / (high - low)), 0, 255).astype(np.uint8)
+    return lut[gray]
+
+
+def _crop_borders(gray: np.ndarray) -> np.ndarray:
+    """
+    Crop uniform margins. The background is the median of the outermost pixels,
+    so both white paper margins and dark scanner or table borders are removed.
+    """
+    height, width = gray.shape
+    edges = np.concatenate((gray[0], gray[-1], gray[:, 0], gray[:, -1]))
+    background = int(np.median(edges))
+    
+    ink_lut = np.abs(np.arange(256) - background) > OCR_CROP_TOLERANCE
+    ink = ink_lut[gray]
+    
+    # Ignore isolated specks: a row/column needs a little ink to count
+    rows = np.flatnonzero(np.count_nonzero(ink, axis=1) > width // 500)
+    cols = np.flatnonzero(np.count_nonzero(ink, axis=0) > height // 500)
+    if rows.size == 0 or cols.size == 0:
+        return gray
+    
+    top = max(0, rows[0] - OCR_CROP_MARGIN)
+    bottom = min(height, rows[-1] + 1 + OCR_CROP_MARGIN)
+    left = max(0, cols[0] - OCR_CROP_MARGIN)
+    right = min(width, cols[-1] + 1 + OCR_CROP_MARGIN)
+    return gray[top:bottom, left:right]
+
+
+def _binarize(gray: np.ndarray) -> np.ndarray:
+    """Otsu threshold computed from the histogram"""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    if np.count_nonzero(hist) < 2:
+        # Uniform image (e.g. a blank page) - there is nothing to separate
+        return gray
+    
+    total = hist.sum()
+    weight_low = np.cumsum(hist)
+    weight_high = total - weight_low
+    mass_low = np.cumsum(hist * np.arange(256))
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mass_low[-1] * weight_low - mass_low * total) ** 2 / (weight_low * weight_high)
+    if np.isnan(between).all():
+        return gray
+    threshold = int(np.nanargmax(between))
+    
+    return np.where(gray > threshold, 255, 0).astype(np.uint8)
+
+
+def _downscale(image: Image.Image, max_dimension: int) -> Image.Image:
+    """Downscale an image to capped_size(), which leaves tall images their height"""
+    if max_dimension:
+        new_size = capped_size(*image.size, max_dimension, tiled=True)
+        if new_size != image.size:
+            image = image.resize(new_size, Image.Resampling.BILINEAR)
+    return image
+
+
+def preprocess_image(image: Image.Image, max_dimension: int = None) -> np.ndarray:
+    """
+    Build the array PaddleOCR runs on, applying the OCR_PREPROCESS steps in
+    a fixed order: grayscale, crop, contrast, downscale, binarize. Cropping
+    comes first so contrast statistics describe the content rather than the
+    margins, and before the downscale so the text keeps as much resolution
+    as the size limit allows.
+    
+    Args:
+        image: PIL image
+        max_dimension: Longest side of the result, None to keep the size
+    
+    Returns:
+        HxWx3 uint8 array, or HxW when preprocessing turned it grayscale
+        (see _model_input)
+    """
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    
+    if not OCR_PREPROCESS:
+        return np.asarray(_downscale(image, max_dimension).convert("RGB"))
+    
+    gray = _to_grayscale(np.asarray(image))
+    if "crop" in OCR_PREPROCESS:
+        gray = _crop_borders(gray)
+    if "contrast" in OCR_PREPROCESS:
+        gray = _stretch_contrast(gray)
+    if max_dimension:
+        gray = np.asarray(_downscale(Image.fromarray(gray), max_dimension))
+    if "binarize" in OCR_PREPROCESS:
+        gray = _binarize(gray)
+    
+    return gray
+
+
+def _split_tiles(img_array: np.ndarray):
+    """
+    Split a tall image into overlapping horizontal bands of OCR_TILE_SIZE rows.
+    Each line found in an overlap belongs to the band whose half of the
+    overlap holds the line's centre, so it is kept exactly once.
+    
+    Returns:
+        List of (tile array, first row, owned rows start, owned rows end) in
+        image coordinates, or None if the image is not tiled
+    """
+    height, width = img_array.shape[:2]
+    if not OCR_TILING or height <= OCR_TILE_SIZE or height < OCR_TILE_ASPECT * width:
+        return None
+    
+    # Spread the bands evenly so every overlap is at least OCR_TILE_OVERLAP
+    stride = OCR_TILE_SIZE - OCR_TILE_OVERLAP
+    count = -(-(height - OCR_TILE_OVERLAP) // stride)
+    starts = [round(i * (height - OCR_TILE_SIZE) / (count - 1)) for i in range(count)]
+    
+    tiles = []
+    for i, start in enumerate(starts):
+        owned_start = (start + starts[i - 1] + OCR_TILE_SIZE) / 2 if i > 0 else 0
+        owned_end = (starts[i + 1] + start + OCR_TILE_SIZE) / 2 if i < count - 1 else height
+        tiles.append((img_array[start:start + OCR_TILE_SIZE], start, owned_start, owned_end))
+    return tiles
+
+
+def _count_tiles(tiles):
+    """Record a tiled page in the batching statistics"""
+    with batch_cond:
+        batch_stats["tiled_pages"] += 1
+        batch_stats["tiles"] += len(tiles)
+
+
+def _merge_tile_lines(tiles, tile_lines):
+    """Join the lines of all tiles in reading order, dropping overlap duplicates"""
+    texts = []
+    for (_, start, owned_start, owned_end), lines in zip(tiles, tile_lines):
+        for text, top, bottom in lines:
+            if top is not None:
+                centre = start + (top + bottom) / 2
+                if not owned_start <= centre < owned_end:
+                    continue
+            texts.append(text)
+    return texts
+
+
+def run_ocr_paddleocr(image: Image.Image, detail: int = 0, lang: str = 'en', max_dimension: int = None):
+    """
+    PaddleOCR processing function. Tall images are OCR'd as overlapping tiles
+    in a single batched inference call.
+    """
+    try:
+        img_array = preprocess_image(image, max_dimension)
+        tiles = _split_tiles(img_array)
         
-        if not result:
+        if tiles:
+            tile_arrays = [tile for tile, _, _, _ in tiles]
+            if ocr_process_pool is not None:
+                tile_lines = ocr_process_pool.submit(_paddle_infer_batch, tile_arrays).result()
+            else:
+                tile_lines = _paddle_infer_batch(tile_arrays)
+            _count_tiles(tiles)
+            texts = _merge_tile_lines(tiles, tile_lines)
+        elif ocr_process_pool is not None:
+            texts = ocr_process_pool.submit(_paddle_infer, img_array).result()
+        else:
+            texts = _paddle_infer(img_array)
+        
+        if not texts:
             return "" if detail == 0 else []
         
-        return " ".join(result[0]["rec_texts"])
+        return " ".join(texts)
         
     except Exception as e:
         print(f"PaddleOCR processing error: {str(e)}")
@@ -99,12 +590,41 @@ def run_ocr(image: Image.Image, lang: str = "id"):
     """
     Main OCR function - using PaddleOCR
     """
-    if max(image.size) > MAX_IMAGE_DIMENSION:
-        ratio = MAX_IMAGE_DIMENSION / max(image.size)
-        new_size = tuple(int(dim * ratio) for dim in image.size)
-        image = image.resize(new_size, Image.Resampling.BILINEAR)
+    return run_ocr_paddleocr(image, detail=0, lang=lang, max_dimension=MAX_IMAGE_DIMENSION)
+
+
+def run_ocr_batched(image: Image.Image, enhanced: bool = False):
+    """
+    OCR one page of a batch job through the micro-batcher, so pages that are
+    in flight at the same time share one inference call. Blocks until done.
+    
+    Args:
+        image: PIL image
+        enhanced: Run like run_ocr_enhanced, without run_ocr's size cap
+    """
+    max_dimension = None if enhanced else MAX_IMAGE_DIMENSION
+    
+    if OCR_BATCH_MAX_SIZE <= 1:
+        return run_ocr_paddleocr(image, max_dimension=max_dimension)
+    
+    # Preprocess in the calling page thread so pages are prepared in parallel.
+    # Failures degrade to an empty page like failed batches do.
+    try:
+        img_array = preprocess_image(image, max_dimension)
+        tiles = _split_tiles(img_array)
+    except Exception as e:
+        print(f"PaddleOCR preprocessing error: {str(e)}")
+        return ""
+    
+    if tiles:
+        # Tiles join the batcher like pages, sharing batches with other pages
+        futures = [submit_ocr_batched(tile) for tile, _, _, _ in tiles]
+        _count_tiles(tiles)
+        texts = _merge_tile_lines(tiles, [future.result() for future in futures])
+    else:
+        texts = [text for text, _, _ in submit_ocr_batched(img_array).result()]
     
-    return run_ocr_paddleocr(image, detail=0, lang=lang)
+    return " ".join(texts)
 
 
 def run_ocr_enhanced(image: Image.Image, options: dict = None):
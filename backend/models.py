@@ -510,4 +510,79 @@ def get_chat_messages_for_api(chat_id: str) -> list:
             ORDER BY message_order ASC
         ''', (chat_id,))
         
-        return [{"content": row["content"], "role": row["role"]} for row in cursor.fetchall()]
\ No newline at end of file
+        return [{"content": row["content"], "role": row["role"]} for row in cursor.fetchall()]
+
+# ============ OCR Job Functions ============
+
+def ensure_ocr_jobs_table():
+    """Create the ocr_jobs table if it does not exist (WAL journal on SQLite)"""
+    with get_db_connection() as conn:
+        cursor = get_cursor(conn)
+        
+        if DATABASE_TYPE == "postgresql":
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ocr_jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id INTEGER,
+                    status TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at DOUBLE PRECISION NOT NULL,
+                    updated_at DOUBLE PRECISION NOT NULL
+                )
+            ''')
+        else:
+            # WAL lets request threads read while workers write job updates
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ocr_jobs (
+                    id TEXT PRIMARY KEY,
+                    user_id INTEGER,
+                    status TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs(status)')
+
+
+def save_ocr_job(job_id: str, user_id: int, status: str, data: str, created_at: float) -> bool:
+    """Insert or update a persisted OCR job"""
+    with get_db_connection() as conn:
+        cursor = get_cursor(conn)
+        
+        execute_query(cursor, '''
+            INSERT INTO ocr_jobs (id, user_id, status, data, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                user_id = excluded.user_id,
+                status = excluded.status,
+                data = excluded.data,
+                updated_at = excluded.updated_at
+        ''', (job_id, user_id, status, data, created_at, time.time()))
+        
+        return cursor.rowcount > 0
+
+
+def get_ocr_jobs() -> list:
+    """Get all persisted OCR jobs, oldest first"""
+    with get_db_connection() as conn:
+        cursor = get_cursor(conn)
+        
+        execute_query(cursor, '''
+            SELECT id, user_id, status, data, created_at
+            FROM ocr_jobs ORDER BY created_at ASC
+        ''')
+        
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def delete_ocr_job(job_id: str) -> bool:
+    """Delete a persisted OCR job"""
+    with get_db_connection() as conn:
+        cursor = get_cursor(conn)
+        
+        execute_query(cursor, 'DELETE FROM ocr_jobs WHERE id = ?', (job_id,))
+        
+        return cursor.rowcount > 0
@@ -4,8 +4,14 @@ Health and Stats Routes
 import time
 from flask import Blueprint, jsonify
 
-from config import MAX_QUEUE_SIZE, AVG_TIME
-from core.queue_manager import get_queue_stats, get_current_job
+from config import MAX_QUEUE_SIZE, OCR_EXECUTION_MODE, OCR_PROCESS_WORKERS, OCR_BACKEND, OCR_PRECISION
+from core.queue_manager import get_queue_stats
+from core.eta import get_eta_stats
+from core.worker import get_pipeline_stats
+from services.file_converter_service import get_cleanup_stats
+from services.webhook_service import get_webhook_stats
+from ml.ocr import get_ocr_batch_stats, get_ocr_setup
+from core.ocr_cache import get_cache_stats
 
 health_bp = Blueprint('health', __name__)
 
@@ -20,7 +26,13 @@ def health_check():
         "timestamp": time.time(),
         "ocr_engine": "PaddleOCR",
         "queue_size": stats["queue_length"],
-        "active_jobs": stats["total_jobs"]
+        "active_jobs": stats["total_jobs"],
+        "busy_workers": len(stats["active_jobs"]),
+        "worker_count": stats["worker_count"],
+        "workers": [
+            {"worker_id": w["worker_id"], "state": w["state"], "job_id": w["job_id"]}
+            for w in stats["workers"]
+        ]
     })
 
 
@@ -28,17 +40,33 @@ def health_check():
 def stats():
     """Server statistics endpoint"""
     queue_stats = get_queue_stats()
+    eta_stats = get_eta_stats()
+    backend, precision = get_ocr_setup() or (None, None)
     
     return jsonify({
         "queue_length": queue_stats["queue_length"],
         "total_jobs": queue_stats["total_jobs"],
-        "current_job": queue_stats["current_job"],
+        "active_jobs": queue_stats["active_jobs"],
+        "worker_count": queue_stats["worker_count"],
+        "workers": queue_stats["workers"],
+        "pipeline": get_pipeline_stats(),
         "max_queue_size": MAX_QUEUE_SIZE,
-        "avg_processing_time": AVG_TIME,
+        "avg_processing_time": eta_stats["avg_job_time"],
+        "eta_estimates": eta_stats,
+        "cleanup": get_cleanup_stats(),
+        "webhooks": get_webhook_stats(),
+        "ocr_cache": get_cache_stats(),
         "ocr_engine": "PaddleOCR",
         "engine_info": {
             "languages": ["en", "id", "multi"],
             "device": "cpu",
-            "textline_orientation_enabled": True
+            "textline_orientation_enabled": True,
+            "execution_mode": OCR_EXECUTION_MODE,
+            "backend": backend,
+            "precision": precision,
+            "configured_backend": OCR_BACKEND,
+            "configured_precision": OCR_PRECISION,
+            "process_workers": OCR_PROCESS_WORKERS if OCR_EXECUTION_MODE == "process" else 0,
+            "batching": get_ocr_batch_stats()
         }
     })
@@ -2,12 +2,21 @@
 OCR Routes
 """
 import os
+import json
 import time
-from flask import Blueprint, request, jsonify, g, send_file
+from flask import Blueprint, Response, request, jsonify, g, send_file
 
-from config import MAX_BATCH_SIZE, AVG_TIME, DOWNLOAD_DIR
-from utils.helpers import allowed_size, parse_ocr_options, load_image_from_file
-from core.queue_manager import create_job, get_job, delete_job, get_job_position
+from config import (
+    MAX_BATCH_SIZE, DOWNLOAD_DIR, TAKE_MAX_WAIT, TAKE_STREAM_KEEPALIVE, TAKE_STREAM_TIMEOUT,
+    TAKE_BULK_MAX_JOBS
+)
+from utils.helpers import allowed_size, parse_ocr_options, read_image_bytes
+from core.queue_manager import (
+    create_job, get_job, delete_job, get_job_position, get_jobs_status, list_user_jobs,
+    get_user_active_jobs, cancel_job, wait_for_job_change, QueueFullError, FINISHED_STATUSES
+)
+from core.eta import estimate_eta
+from core.ocr_cache import cached_ocr
 from ml.ocr import run_ocr_paddleocr, run_ocr_enhanced
 from ml.kolosal_ocr import run_ocr_kolosal, format_kolosal_result_for_file
 from middleware.auth import jwt_required
@@ -21,6 +30,17 @@ VALID_FILE_TYPES = ["excel", "pdf"]
 VALID_ENGINES = ["paddleocr", "kolosalocr"]
 
 
+def queue_full_response(error):
+    """503 response telling the client when to retry a rejected job"""
+    response = jsonify({
+        "error": f"{error}, try again later",
+        "retry_after": error.retry_after
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
 @ocr_bp.route("/ocr", methods=["POST"])
 @jwt_required
 def ocr_single():
@@ -43,7 +63,7 @@ def ocr_single():
     if not allowed_size(file):
         return jsonify({"error": "Image exceeds 2MB"}), 413
     
-    image, error = load_image_from_file(file)
+    image_data, error = read_image_bytes(file)
     if error:
         return jsonify({"error": "Invalid image"}), 400
     
@@ -59,16 +79,16 @@ def ocr_single():
         ocr_options["invoice"] = request.form.get("invoice", "false").lower() == "true"
         ocr_options["language"] = request.form.get("language", "auto")
     
-    job_id, position, eta = create_job(
-        "single", [image], webhook,
-        use_enhanced, ocr_options,
-        user_id=g.current_user["id"],
-        file_type=file_type,
-        engine=engine
-    )
-    
-    if job_id is None:
-        return jsonify({"error": "Queue is full, try again later"}), 503
+    try:
+        job_id, position, eta = create_job(
+            "single", [image_data], webhook,
+            use_enhanced, ocr_options,
+            user_id=g.current_user["id"],
+            file_type=file_type,
+            engine=engine
+        )
+    except QueueFullError as e:
+        return queue_full_response(e)
     
     return jsonify({
         "job_id": job_id,
@@ -112,11 +132,11 @@ def ocr_batch():
             errors.append({"index": idx, "error": "exceeds 2MB"})
             continue
         
-        image, error = load_image_from_file(f)
+        image_data, error = read_image_bytes(f)
         if error:
             errors.append({"index": idx, "error": "invalid image"})
         else:
-            images.append(image)
+            images.append(image_data)
     
     if len(images) == 0:
         return jsonify({"error": "No valid images"}), 400
@@ -133,16 +153,16 @@ def ocr_batch():
         ocr_options["invoice"] = request.form.get("invoice", "false").lower() == "true"
         ocr_options["language"] = request.form.get("language", "auto")
     
-    job_id, position, eta = create_job(
-        "batch", images, webhook,
-        use_enhanced, ocr_options,
-        user_id=g.current_user["id"],
-        file_type=file_type,
-        engine=engine
-    )
-    
-    if job_id is None:
-        return jsonify({"error": "Queue is full, try again later"}), 503
+    try:
+        job_id, position, eta = create_job(
+            "batch", images, webhook,
+            use_enhanced, ocr_options,
+            user_id=g.current_user["id"],
+            file_type=file_type,
+            engine=engine
+        )
+    except QueueFullError as e:
+        return queue_full_response(e)
     
     return jsonify({
         "job_id": job_id,
@@ -180,7 +200,7 @@ def ocr_direct():
     if not allowed_size(file):
         return jsonify({"error": "Image exceeds 2MB"}), 413
     
-    image, error = load_image_from_file(file)
+    data, error = read_image_bytes(file)
     if error:
         return jsonify({"error": "Invalid image"}), 400
     
@@ -200,7 +220,10 @@ def ocr_direct():
                 "invoice": request.form.get("invoice", "false").lower() == "true",
                 "language": request.form.get("language", "auto")
             }
-            kolosal_result = run_ocr_kolosal(image, kolosal_options)
+            kolosal_result = cached_ocr(
+                data, engine, kolosal_options,
+                lambda image: run_ocr_kolosal(image, kolosal_options)
+            )
             normalized = format_kolosal_result_for_file(kolosal_result)
             normalized_results = [normalized]
         else:
@@ -211,9 +234,17 @@ def ocr_direct():
                     "min_confidence": min_confidence,
                     "merge_lines": request.form.get("merge_lines", "true").lower() == "true"
                 }
-                result = run_ocr_enhanced(image, ocr_options)
+                result = cached_ocr(
+                    data, "paddleocr-enhanced", ocr_options,
+                    lambda image: run_ocr_enhanced(image, ocr_options),
+                    tiled=True
+                )
             else:
-                result = run_ocr_paddleocr(image, detail=detail, lang=lang)
+                result = cached_ocr(
+                    data, "paddleocr-direct", {"detail": detail},
+                    lambda image: run_ocr_paddleocr(image, detail=detail, lang=lang),
+                    tiled=True
+                )
             
             # Format via chat service if user is authenticated
             user_id = g.current_user.get("id") if g.current_user else None
@@ -255,21 +286,21 @@ def ocr_direct():
         }), 500
 
 
-@ocr_bp.route("/take/<job_id>", methods=["GET"])
-@jwt_required
-def take(job_id):
-    """Get job status and download link (requires authentication)"""
-    job = get_job(job_id)
-    
-    if job is None:
-        return jsonify({"error": "job not found"}), 404
-    
-    if job.get("user_id") and job.get("user_id") != g.current_user["id"]:
-        return jsonify({"error": "Unauthorized to access this job"}), 403
+def job_status(job_id, job):
+    """
+    Build the /take payload for a job. Failed jobs and done jobs whose file
+    is gone are deleted once reported.
+    
+    Returns:
+        Tuple of (payload dict, HTTP status code)
+    """
+    # Read the version before anything else so the payload never claims a
+    # version newer than the fields it reports
+    version = job.get("version", 0)
     
     if job["status"] in ["queued", "processing", "formatting", "converting"]:
         position = get_job_position(job_id)
-        eta = (position * AVG_TIME) + (AVG_TIME * (job["total_images"] - job["processed"]))
+        eta = estimate_eta(job, position)
         
         status_messages = {
             "queued": "Waiting in queue",
@@ -278,7 +309,7 @@ def take(job_id):
             "converting": "Converting to file"
         }
         
-        return jsonify({
+        return {
             "job_id": job_id,
             "status": job["status"],
             "status_message": status_messages.get(job["status"], job["status"]),
@@ -287,8 +318,17 @@ def take(job_id):
             "eta_seconds": eta,
             "enhanced_mode": job.get("use_enhanced", False),
             "file_type": job.get("file_type", "excel"),
-            "chat_id": job.get("chat_id")
-        })
+            "chat_id": job.get("chat_id"),
+            "cancel_requested": job.get("cancel_requested", False),
+            "version": version
+        }, 200
+    
+    if job["status"] == "cancelled":
+        return {
+            "job_id": job_id,
+            "status": "cancelled",
+            "progress": f"{job['processed']}/{job['total_images']}"
+        }, 200
     
     if job["status"] == "failed":
         error_data = {
@@ -298,7 +338,7 @@ def take(job_id):
             "chat_id": job.get("chat_id")
         }
         delete_job(job_id)
-        return jsonify(error_data), 500
+        return error_data, 500
     
     if job["status"] == "done":
         file_path = job.get("file_path")
@@ -307,19 +347,191 @@ def take(job_id):
         
         if not file_path or not os.path.exists(file_path):
             delete_job(job_id)
-            return jsonify({"error": "File not found"}), 404
+            return {"error": "File not found"}, 404
         
         filename = os.path.basename(file_path)
         
-        return jsonify({
+        return {
             "job_id": job_id,
             "status": "done",
             "file_type": file_type,
             "chat_id": chat_id,
             "download_url": f"/download/{filename}"
-        })
+        }, 200
+    
+    return {"error": "Unknown job status"}, 500
+
+
+@ocr_bp.route("/take/<job_id>", methods=["GET"])
+@jwt_required
+def take(job_id):
+    """
+    Get job status and download link (requires authentication)
+    
+    With ?wait=<seconds> (max TAKE_MAX_WAIT) the request is held until the job
+    changes status, progress or queue position. Pass the last seen ?version=
+    to return immediately if something changed since.
+    """
+    job = get_job(job_id)
+    
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    
+    if job.get("user_id") and job.get("user_id") != g.current_user["id"]:
+        return jsonify({"error": "Unauthorized to access this job"}), 403
+    
+    wait = min(request.args.get("wait", 0, type=float), TAKE_MAX_WAIT)
+    if wait > 0 and job["status"] not in FINISHED_STATUSES:
+        version = request.args.get("version", job.get("version", 0), type=int)
+        position = get_job_position(job_id) if job["status"] == "queued" else None
+        job = wait_for_job_change(job_id, version, position, wait)
+        if job is None:
+            return jsonify({"error": "job not found"}), 404
+    
+    data, status_code = job_status(job_id, job)
+    return jsonify(data), status_code
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@ocr_bp.route("/take/<job_id>/events", methods=["GET"])
+@jwt_required
+def take_events(job_id):
+    """
+    Stream job status as Server-Sent Events (requires authentication).
+    A "status" event is sent for every change, carrying the same payload as
+    GET /take; the stream ends once the job is done, failed or cancelled.
+    """
+    job = get_job(job_id)
+    
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    
+    if job.get("user_id") and job.get("user_id") != g.current_user["id"]:
+        return jsonify({"error": "Unauthorized to access this job"}), 403
+    
+    def stream():
+        last_data = None
+        deadline = time.time() + TAKE_STREAM_TIMEOUT
+        
+        while True:
+            job = get_job(job_id)
+            if job is None:
+                yield sse_event("error", {"job_id": job_id, "error": "job not found"})
+                return
+            
+            # Wait against the version read before the payload was built, so a
+            # change racing with this iteration still wakes the next wait
+            version = job.get("version", 0)
+            data, _ = job_status(job_id, job)
+            if data != last_data:
+                yield sse_event("status", data)
+                last_data = data
+            else:
+                yield ": keepalive\n\n"
+            
+            remaining = deadline - time.time()
+            if job["status"] in FINISHED_STATUSES or remaining <= 0:
+                return
+            
+            wait_for_job_change(
+                job_id, version, data.get("position"),
+                min(TAKE_STREAM_KEEPALIVE, remaining)
+            )
+    
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
+def format_job_snapshot(snapshot):
+    """Turn a queue snapshot into the public job summary"""
+    file_path = snapshot.pop("file_path")
+    error = snapshot.pop("error")
+    snapshot["progress"] = f"{snapshot['processed']}/{snapshot['total_images']}"
+    if snapshot["status"] == "done" and file_path:
+        snapshot["download_url"] = f"/download/{os.path.basename(file_path)}"
+    elif snapshot["status"] == "failed":
+        snapshot["error"] = error
+    return snapshot
+
+
+@ocr_bp.route("/take/bulk", methods=["POST"])
+@jwt_required
+def take_bulk():
+    """
+    Get the status of many jobs in one request (requires authentication).
+    Body: {"job_ids": [...]}; omit job_ids to get all of the user's unfinished jobs.
+    Unlike GET /take this never deletes failed jobs.
+    """
+    data = request.get_json(silent=True) or {}
+    job_ids = data.get("job_ids")
+    
+    if job_ids is not None:
+        if not isinstance(job_ids, list) or not all(isinstance(job_id, str) for job_id in job_ids):
+            return jsonify({"error": "job_ids must be a list of job IDs"}), 400
+        if len(job_ids) > TAKE_BULK_MAX_JOBS:
+            return jsonify({"error": f"At most {TAKE_BULK_MAX_JOBS} job IDs per request"}), 400
+    
+    snapshots, missing = get_jobs_status(g.current_user["id"], job_ids)
+    
+    return jsonify({
+        "jobs": [format_job_snapshot(snapshot) for snapshot in snapshots],
+        "not_found": missing
+    })
+
+
+@ocr_bp.route("/jobs", methods=["GET"])
+@jwt_required
+def list_jobs():
+    """
+    List the current user's jobs, newest first (requires authentication).
+    Query: page (default 1), per_page (default 20, max 100), status (optional filter).
+    """
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = min(100, max(1, request.args.get("per_page", 20, type=int)))
+    status = request.args.get("status")
+    user_id = g.current_user["id"]
+    
+    snapshots, total = list_user_jobs(user_id, (page - 1) * per_page, per_page, status)
+    
+    return jsonify({
+        "jobs": [format_job_snapshot(snapshot) for snapshot in snapshots],
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "active_jobs": get_user_active_jobs(user_id)
+    })
+
+
+@ocr_bp.route("/take/<job_id>", methods=["DELETE"])
+@jwt_required
+def cancel(job_id):
+    """Cancel a queued or running job (requires authentication)"""
+    job = get_job(job_id)
     
-    return jsonify({"error": "Unknown job status"}), 500
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    
+    if job.get("user_id") and job.get("user_id") != g.current_user["id"]:
+        return jsonify({"error": "Unauthorized to access this job"}), 403
+    
+    status = cancel_job(job_id)
+    if status is None:
+        return jsonify({
+            "error": "Job has already finished",
+            "status": job["status"]
+        }), 409
+    
+    return jsonify({
+        "job_id": job_id,
+        "status": status,
+        "status_message": "Job cancelled" if status == "cancelled" else "Stopping after the current page"
+    })
 
 
 @ocr_bp.route("/download/<filename>", methods=["GET"])
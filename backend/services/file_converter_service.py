@@ -3,18 +3,100 @@ File Converter Service - Convert data to Excel/PDF
 """
 import os
 import json
+import time
 import uuid
+import threading
 from datetime import datetime
 
 from config import DOWNLOAD_DIR
 
 
+# Download file garbage collection metrics
+cleanup_lock = threading.Lock()
+cleanup_stats = {
+    "expired_files_removed": 0,
+    "orphaned_files_removed": 0,
+    "bytes_freed": 0,
+    "last_sweep_at": None
+}
+
+
 def ensure_download_dir():
     """Ensure download directory exists"""
     if not os.path.exists(DOWNLOAD_DIR):
         os.makedirs(DOWNLOAD_DIR)
 
 
+def _remove_file(path):
+    """Remove a file and return the number of bytes freed (0 if it was already gone)"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+    except OSError:
+        return 0
+
+
+def remove_download_file(file_path):
+    """Delete the output file of an expired job"""
+    if not file_path:
+        return 0
+    
+    freed = _remove_file(file_path)
+    if freed:
+        with cleanup_lock:
+            cleanup_stats["expired_files_removed"] += 1
+            cleanup_stats["bytes_freed"] += freed
+    return freed
+
+
+def sweep_orphaned_files(referenced_paths, min_age=None):
+    """
+    Delete files in DOWNLOAD_DIR that no job references and that are older
+    than min_age seconds (e.g. /ocr/direct outputs, files of deleted jobs)
+    
+    Args:
+        referenced_paths: Set of normalized file paths still owned by jobs
+        min_age: Minimum file age in seconds before it can be removed
+    
+    Returns:
+        Tuple of (files_removed, bytes_freed)
+    """
+    if not os.path.isdir(DOWNLOAD_DIR):
+        return 0, 0
+    
+    cutoff = time.time() - (min_age or 0)
+    removed = 0
+    freed = 0
+    
+    with os.scandir(DOWNLOAD_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if os.path.normpath(entry.path) in referenced_paths:
+                continue
+            if entry.stat().st_mtime > cutoff:
+                continue
+            
+            size = _remove_file(entry.path)
+            if size or not os.path.exists(entry.path):
+                removed += 1
+                freed += size
+    
+    with cleanup_lock:
+        cleanup_stats["orphaned_files_removed"] += removed
+        cleanup_stats["bytes_freed"] += freed
+        cleanup_stats["last_sweep_at"] = time.time()
+    
+    return removed, freed
+
+
+def get_cleanup_stats():
+    """Get download file garbage collection metrics"""
+    with cleanup_lock:
+        return dict(cleanup_stats)
+
+
 def flatten_data(data, parent_key='', sep='_'):
     """Flatten nested dict/list for Excel"""
     items = []
@@ -0,0 +1,122 @@
+"""
+Webhook Service - Asynchronous job notifications with retries and HMAC signing
+"""
+import hmac
+import json
+import time
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from config import (
+    WEBHOOK_SECRET, WEBHOOK_TIMEOUT, WEBHOOK_MAX_CONCURRENCY,
+    WEBHOOK_MAX_RETRIES, WEBHOOK_BACKOFF_BASE, WEBHOOK_BACKOFF_MAX, WEBHOOK_MAX_PENDING
+)
+
+# Pooled session so repeated deliveries to the same host reuse connections
+webhook_session = requests.Session()
+webhook_session.mount("http://", HTTPAdapter(pool_maxsize=WEBHOOK_MAX_CONCURRENCY))
+webhook_session.mount("https://", HTTPAdapter(pool_maxsize=WEBHOOK_MAX_CONCURRENCY))
+
+webhook_executor = ThreadPoolExecutor(max_workers=WEBHOOK_MAX_CONCURRENCY, thread_name_prefix="webhook")
+
+stats_lock = threading.Lock()
+webhook_stats = {
+    "pending": 0,
+    "delivered": 0,
+    "failed": 0,
+    "retries": 0,
+    "dropped": 0,
+    "total_latency": 0.0
+}
+
+
+def _incr(key, amount=1):
+    with stats_lock:
+        webhook_stats[key] += amount
+
+
+def sign_payload(body: bytes, timestamp: str) -> str:
+    """HMAC-SHA256 signature of '<timestamp>.<body>' with WEBHOOK_SECRET"""
+    message = timestamp.encode() + b"." + body
+    return hmac.new(WEBHOOK_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _should_retry(status_code):
+    """Retry on server errors and rate limiting, not on other client errors"""
+    return status_code >= 500 or status_code == 429
+
+
+def _deliver(url, body, attempt):
+    """Attempt one delivery; schedules a retry with exponential backoff on failure"""
+    timestamp = str(int(time.time()))
+    headers = {
+        "Content-Type": "application/json",
+        "X-Webhook-Timestamp": timestamp,
+        "X-Webhook-Attempt": str(attempt + 1)
+    }
+    if WEBHOOK_SECRET:
+        headers["X-Webhook-Signature"] = f"sha256={sign_payload(body, timestamp)}"
+    
+    started = time.time()
+    retryable = True
+    error = None
+    try:
+        response = webhook_session.post(url, data=body, headers=headers, timeout=WEBHOOK_TIMEOUT)
+        if response.status_code < 300:
+            with stats_lock:
+                webhook_stats["pending"] -= 1
+                webhook_stats["delivered"] += 1
+                webhook_stats["total_latency"] += time.time() - started
+            return
+        retryable = _should_retry(response.status_code)
+        error = f"HTTP {response.status_code}"
+    except requests.RequestException as e:
+        error = str(e)
+    
+    if retryable and attempt < WEBHOOK_MAX_RETRIES:
+        delay = min(WEBHOOK_BACKOFF_MAX, WEBHOOK_BACKOFF_BASE * (2 ** attempt))
+        _incr("retries")
+        # The timer only resubmits; the delivery itself runs on the bounded pool
+        timer = threading.Timer(delay, webhook_executor.submit, args=(_deliver, url, body, attempt + 1))
+        timer.daemon = True
+        timer.start()
+        return
+    
+    with stats_lock:
+        webhook_stats["pending"] -= 1
+        webhook_stats["failed"] += 1
+    print(f"Webhook delivery to {url} failed after {attempt + 1} attempts: {error}")
+
+
+def send_webhook(url: str, payload: dict) -> bool:
+    """
+    Queue a webhook delivery without blocking the caller
+    
+    Args:
+        url: Webhook URL
+        payload: JSON-serializable payload
+    
+    Returns:
+        True if queued, False if dropped because too many deliveries are pending
+    """
+    with stats_lock:
+        if webhook_stats["pending"] >= WEBHOOK_MAX_PENDING:
+            webhook_stats["dropped"] += 1
+            return False
+        webhook_stats["pending"] += 1
+    
+    body = json.dumps(payload, default=str).encode()
+    webhook_executor.submit(_deliver, url, body, 0)
+    return True
+
+
+def get_webhook_stats():
+    """Get webhook delivery metrics"""
+    with stats_lock:
+        stats = dict(webhook_stats)
+    total_latency = stats.pop("total_latency")
+    stats["avg_latency_ms"] = round(1000 * total_latency / stats["delivered"], 1) if stats["delivered"] else None
+    return stats
@@ -2,10 +2,11 @@
 Utility Helper Functions
 """
 import os
+from io import BytesIO
 from PIL import Image
 from flask import request
 
-from config import MAX_FILE_SIZE
+from config import MAX_FILE_SIZE, MAX_IMAGE_DIMENSION, OCR_TILING, OCR_TILE_ASPECT, OCR_TILE_MAX_LENGTH
 
 
 def allowed_size(file):
@@ -38,10 +39,53 @@ def parse_ocr_options(form_data):
     return ocr_options
 
 
-def load_image_from_file(file):
-    """Load and convert image from file"""
+def read_image_bytes(file):
+    """
+    Read an uploaded image as its original compressed bytes.
+    Only the header is parsed to validate it; pixels are decoded later by the worker.
+    """
     try:
-        image = Image.open(file).convert("RGB")
-        return image, None
+        data = file.read()
+        with Image.open(BytesIO(data)) as image:
+            image.verify()
+        return data, None
     except Exception as e:
         return None, str(e)
+
+
+def capped_size(width, height, max_dimension=MAX_IMAGE_DIMENSION, tiled=False):
+    """
+    Size an image is scaled down to for OCR. The longest side is capped at
+    max_dimension. On the PaddleOCR path (tiled=True) with tiling enabled, tall
+    images only have their width capped (and their height at OCR_TILE_MAX_LENGTH),
+    since they are OCR'd in bands rather than as one image.
+    """
+    if tiled and OCR_TILING and height >= OCR_TILE_ASPECT * width:
+        scale = min(1.0, max_dimension / width, OCR_TILE_MAX_LENGTH / height)
+    else:
+        scale = min(1.0, max_dimension / max(width, height))
+    
+    if scale >= 1.0:
+        return width, height
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def decode_image(data, max_dimension=MAX_IMAGE_DIMENSION, tiled=False):
+    """
+    Decode compressed image bytes into an RGB image capped to capped_size().
+    JPEGs are decoded directly at a reduced DCT scale (draft mode), so large
+    photos are never held at full resolution; other formats are shrunk with
+    a cheap box reduction before the final resize.
+    """
+    with Image.open(BytesIO(data)) as image:
+        target = capped_size(*image.size, max_dimension, tiled) if max_dimension else image.size
+        if target == image.size:
+            return image.convert("RGB")
+        
+        # No-op for non-JPEG images; picks the smallest scale still >= target
+        image.draft("RGB", target)
+        image = image.convert("RGB")
+        
+        if image.size != target:
+            image = image.resize(target, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        return image